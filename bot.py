@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
 load_dotenv()
@@ -9,33 +8,24 @@ import asyncio
 import datetime
 import logging
 import os
-import subprocess
-import traceback
-
+import time
+import typing
+
+import src.utils.api
+import src.utils.build
+import src.utils.charts
+import src.utils.command_sync
+import src.utils.logs
+import src.utils.metrics
+import src.utils.refresher
+import src.utils.reloader
 import src.utils.sqls
 
-formatting = logging.Formatter("[%(asctime)s] - [%(levelname)s] [%(name)s] %(message)s")
-
-logging.basicConfig(
-    level=logging.NOTSET,
-    format="[%(asctime)s] - [%(levelname)s] [%(name)s] %(message)s",
-    datefmt="%Y/%m/%d %H:%M:%S",
-)
+started_at = time.perf_counter()
 
+# started once the chart workers are forked, records logged until then wait in its queue
+log_listener = src.utils.logs.setup()
 log = logging.getLogger("")
-log.setLevel(logging.NOTSET)
-
-try:
-    os.mkdir("logs")
-except FileExistsError:
-    pass
-with open("logs/bot.log", "w") as f:
-    f.write("")
-f = logging.FileHandler("logs/bot.log", "r")
-f.setFormatter(formatting)
-log.addHandler(f)
-
-logging.getLogger("discord").setLevel(logging.WARNING)  # mute
 
 bot = commands.Bot(command_prefix="", intents=discord.Intents.all())
 bot.log = log
@@ -43,51 +33,51 @@ bot.log = log
 observer = Observer()
 
 
-class FileHandler(FileSystemEventHandler):
-    def on_modified(self, event):
-        log.info(f"File changed: {event.src_path}")
-        if event.src_path.endswith(".py"):
-            log.info("Reloading...")
-            path = event.src_path.replace("\\", "/").replace("/", ".")[:-3]
-            try:
-                asyncio.run(bot.reload_extension(path))
-                log.info(f"Reloaded {path}")
-            except Exception as e:
-                log.error(f"Failed to reload {path}")
-                log.error(e)
-                log.error(traceback.format_exc())
+# how long each startup phase took in seconds, phases in one gather overlap
+bot.startup = {}
+
+
+async def timed(name: str, coro: typing.Awaitable) -> typing.Any:
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        bot.startup[name] = time.perf_counter() - started
 
 
-observer.schedule(FileHandler(), path="src", recursive=False)
+async def connect_database():
+    bot.db = src.utils.sqls.EasySQL()
+    await bot.db.connect()
+    with open("src/utils/sqls/init.sql") as f:
+        await bot.db.execute(f.read())
+    log.info("Connected to database")
 
 
-def get_git_revision_short_hash() -> str:
-    return (
-        subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])
-        .decode("ascii")
-        .strip()
+async def load_extension(name: str):
+    await bot.load_extension(name)
+    log.info(f"Loaded extension {name}")
+
+
+async def load_extensions():
+    await asyncio.gather(
+        *(
+            load_extension(f"src.{extension[:-3]}")
+            for extension in os.listdir("src")
+            if extension.endswith(".py") and not extension.startswith("_")
+        ),
+        load_extension("jishaku"),
     )
 
 
-def get_version():
-    is_updated = subprocess.check_output("git status", shell=True).decode("ascii")
+async def database_and_extensions():
+    await timed("database", connect_database())
+    await timed("extensions", load_extensions())
 
-    if "modified" in is_updated:
-        is_updated = None
-    elif (
-        "up to date" in is_updated
-        or "nothing to commit, working tree clean" in is_updated
-    ):
-        is_updated = True
-    else:
-        is_updated = False
 
-    if is_updated:
-        bot.version_ = f"latest ({get_git_revision_short_hash()})"
-    elif is_updated is None:
-        bot.version_ = f"{get_git_revision_short_hash()} (modified)"
-    else:
-        bot.version_ = f"old ({get_git_revision_short_hash()}) - not up to date"
+async def load_version():
+    build = await src.utils.build.load()
+    bot.version_ = build.version
+    log.info(f"Version {bot.version_} (from {build.source})")
 
 
 @bot.event
@@ -96,8 +86,9 @@ async def on_ready():
     log.info(bot.user.name)
     log.info(bot.user.id)
     log.info("------")
+    log.info(f"Ready {time.perf_counter() - started_at:.2f}s after starting")
     await bot.change_presence(activity=discord.Game(name="a!help"))
-    await bot.tree.sync()
+    await bot.command_sync.sync()
 
 
 async def main():
@@ -105,35 +96,64 @@ async def main():
         started = False
         while not started:
             async with bot:
-                for extension in os.listdir("src"):
-                    if extension.endswith(".py") and not extension.startswith("_"):
-                        await bot.load_extension(f"src.{extension[:-3]}")
-                        log.info(f"Loaded extension {extension[:-3]}")
-                await bot.load_extension("jishaku")
-                log.info("Loaded jishaku")
+                # before any other thread starts (DNS lookups and git run in threads
+                # too), chart workers are forked from this process
+                bot.charts = src.utils.charts.ChartRenderer()
+                await timed("charts", bot.charts.start())
+                log_listener.start()
+                log.info("Started chart renderer")
+
+                # cogs may use the pool in `setup`, so extensions wait for the
+                # database, everything else overlaps
+                await asyncio.gather(
+                    database_and_extensions(),
+                    timed("version", load_version()),
+                    timed("http client", src.utils.api.Request.start()),
+                )
 
+                observer.schedule(
+                    src.utils.reloader.Reloader(bot, asyncio.get_running_loop()),
+                    path="src",
+                    recursive=True,
+                )
                 observer.start()
                 log.info("Started file watcher")
                 bot.start_time = datetime.datetime.utcnow()
-                get_version()
+                bot.command_sync = src.utils.command_sync.CommandSync(bot.tree, bot.db)
+                bot.refresher = src.utils.refresher.Refresher(bot.db)
+                bot.refresher.start()
+                log.info("Started player refresher")
+                src.utils.metrics.instrument(bot)
+                bot.metrics = src.utils.metrics.Server()
+                bot.metrics.start()
+                log.info(f"Serving metrics on port {bot.metrics.port}")
                 log.info(
-                    f"Started with version {bot.version_} and started at {bot.start_time}"
+                    f"Started in {time.perf_counter() - started_at:.2f}s ("
+                    + ", ".join(
+                        f"{name} {took * 1000:.0f}ms"
+                        for name, took in bot.startup.items()
+                    )
+                    + ")"
                 )
 
-                db = src.utils.sqls.EasySQL()
-                await db.connect()
-                with open("src/utils/sqls/init.sql") as f:
-                    await db.execute(f.read())
-
                 try:
                     await bot.start(os.environ["TOKEN"])
                 except discord.errors.HTTPException:
                     log.exception("You likely got ratelimited or bot's token is wrong")
+                finally:
+                    bot.metrics.close()
+                    await bot.refresher.close()
+                    await src.utils.api.Request.close()
+                    await bot.db.close()
+                    bot.charts.close()
                 started = True  # break loop
     except KeyboardInterrupt:
         log.info("Exiting...")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-    observer.stop()
+    try:
+        asyncio.run(main())
+    finally:
+        observer.stop()
+        log_listener.stop()
@@ -0,0 +1 @@
+from .config import git_repo, prefix, token
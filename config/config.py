@@ -2,12 +2,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 import os
-import subprocess
 
 token = os.getenv("TOKEN")
 prefix = os.getenv("PREFIX")
-git_repo = (
-    subprocess.check_output("git config --get remote.origin.url".split(" "))
-    .decode("ascii")
-    .strip()
-)[:-4]
+# read from the environment, shelling out to git here would block every import
+git_repo = os.getenv("GIT_REPO", "https://github.com/timelessnesses/osk-game")
+if git_repo.endswith(".git"):
+    git_repo = git_repo[:-4]
@@ -1,15 +1,15 @@
-import copy
-import difflib
+import datetime
 import io
 import logging
-import subprocess
 import sys
-import traceback
 
 import discord
 from discord.ext import commands
 from discord.utils import MISSING
 
+from .utils import build, time
+from .utils.error_store import ErrorStore
+
 sys.path.append("..")
 import config
 
@@ -18,59 +18,51 @@ class Error_Handling(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.log = logging.getLogger("root.Events")
+        self.store = ErrorStore()
 
-    def revision_long_hash(self) -> str:
-        return (
-            subprocess.check_output(["git", "rev-parse", "HEAD"])
-            .decode("ascii")
-            .strip()
-        )
+    async def cog_unload(self):
+        await self.store.flush()
 
-    def revision_short_hash(self) -> str:
-        return (
-            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])
-            .decode("ascii")
-            .strip()
+    @commands.hybrid_command(name="errors")
+    @commands.is_owner()
+    async def errors(self, ctx: commands.Context, fingerprint: str = None):
+        """
+        Recent unhandled errors, or the latest traceback of one fingerprint.
+        """
+        if fingerprint is not None:
+            found = await self.store.trace(fingerprint)
+            if found is None:
+                await ctx.send(f"No single error matches `{fingerprint}`.")
+                return
+            entry, trace = found
+            await ctx.send(
+                f"`{entry.fingerprint}` {entry.type}, seen {entry.count} times",
+                file=discord.File(io.StringIO(trace), filename="errorlog.py"),
+            )
+            return
+        entries = await self.store.recent(15)
+        embed = discord.Embed(
+            title="Errors",
+            description="\n".join(
+                f"`{entry.fingerprint}` **{entry.type}** in {entry.command or '-'}: "
+                f"{entry.count}x, last "
+                + time.format_relative(
+                    datetime.datetime.fromtimestamp(
+                        entry.last_seen, datetime.timezone.utc
+                    )
+                )
+                for entry in entries
+            )
+            or "No errors recorded.",
+            color=discord.Color.red(),
         )
+        await ctx.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: Exception):
-        python_version = sys.version_info
-        error_message = "".join(
-            traceback.format_exception(type(error), error, error.__traceback__)
-        )
-        j = copy.copy(error_message)
-        discord_version = discord.__version__
-        file = MISSING
-        if len(error_message) <= 4096:
-            file = discord.File(io.StringIO(error_message), filename="errorlog.py")
-            error_message = "Error is too long consider reading the errorlog.py file."
         if isinstance(error, commands.CommandNotFound):
-            matches = difflib.get_close_matches(ctx.bot.commands, ctx.invoked_with)
-            if len(matches) >= 2:
-                await ctx.send(
-                    embed=discord.Embed(
-                        title="Did you mean...",
-                        description=f"{', '.join(matches)} or {matches[0]}?",
-                        color=discord.Color.yellow(),
-                    )
-                )
-            elif len(matches) == 1:
-                await ctx.send(
-                    embed=discord.Embed(
-                        title="Did you mean...",
-                        description=f"{matches[0]}?",
-                        color=discord.Color.yellow(),
-                    )
-                )
-            else:
-                await ctx.send(
-                    embed=discord.Embed(
-                        title="Command not found",
-                        description=f"{ctx.invoked_with} is not a valid command.",
-                        color=discord.Color.red(),
-                    )
-                )
+            # with an empty prefix every message lands here, don't answer chatter
+            return
         elif isinstance(error, commands.MissingRequiredArgument):
             await ctx.send(
                 embed=discord.Embed(
@@ -106,32 +98,53 @@ class Error_Handling(commands.Cog):
                 )
             )
         else:
+            await self.report(ctx, getattr(error, "original", error))
+
+    async def report(self, ctx: commands.Context, error: BaseException):
+        command = ctx.command.qualified_name if ctx.command is not None else None
+        entry, trace, report = await self.store.record(error, command)
+        if not report:
+            # seen recently, the full report is already out there
+            self.log.debug(f"Error {entry.fingerprint} again ({entry.count} times)")
             await ctx.send(
-                embed=(
-                    (
-                        discord.Embed(
-                            title="Error",
-                            description=f"```py\n{error_message}\n```",
-                            color=0xFF0000,
-                        )
-                    ).add_field(
-                        name="Python Version",
-                        value=f"{python_version[0]}.{python_version[1]}.{python_version[2]}",
-                        inline=True,
-                    )
-                )
-                .add_field(
-                    name="Discord.py Version", value=discord_version, inline=True
+                embed=discord.Embed(
+                    title="Error",
+                    description=f"Something went wrong, this is a known error "
+                    f"(`{entry.fingerprint}`) and has been reported.",
+                    color=0xFF0000,
                 )
-                .add_field(
-                    name="Github commit number",
-                    value=f"[{self.revision_short_hash()}]({config.git_repo}/commit/{self.revision_long_hash()})",
-                    inline=True,
-                ),
-                file=file,
             )
-            self.bot.log.error(j)
+            return
+
+        self.log.error(f"Error {entry.fingerprint} in {command}:\n{trace}")
+        file = MISSING
+        description = f"```py\n{trace}\n```"
+        if len(description) > 4096:
+            file = discord.File(io.StringIO(trace), filename="errorlog.py")
+            description = "Error is too long consider reading the errorlog.py file."
+        current = build.current()
+        python_version = sys.version_info
+        embed = (
+            discord.Embed(title="Error", description=description, color=0xFF0000)
+            .add_field(
+                name="Python Version",
+                value=f"{python_version[0]}.{python_version[1]}.{python_version[2]}",
+                inline=True,
+            )
+            .add_field(
+                name="Discord.py Version", value=discord.__version__, inline=True
+            )
+            .add_field(
+                name="Github commit number",
+                value=f"[{current.short}]({config.git_repo}/commit/{current.commit})"
+                if current.commit
+                else current.short,
+                inline=True,
+            )
+            .set_footer(text=f"{entry.fingerprint} · seen {entry.count} times")
+        )
+        await ctx.send(embed=embed, file=file)
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(Error_handling(bot))
+    await bot.add_cog(Error_Handling(bot))
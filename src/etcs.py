@@ -1,3 +1,4 @@
+import math
 import platform
 import sys
 from datetime import datetime
@@ -6,7 +7,8 @@ import discord
 import psutil
 from discord.ext import commands
 
-from .utils import time
+from .utils import leaderboard, metrics, time
+from .utils.api import PlayerAPI, Request
 
 sys.path.append("..")
 import config
@@ -94,6 +96,142 @@ class Stuff(
         )
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(name="ingest")
+    @commands.is_owner()
+    async def ingest(self, ctx: commands.Context):
+        """
+        Refresh the local Tetra League leaderboard snapshot.
+        """
+        try:
+            count, took = await leaderboard.ingest(self.bot.db)
+        except leaderboard.IngestRunning:
+            await ctx.send(
+                embed=discord.Embed(
+                    title="Already ingesting",
+                    description="Another ingest is still running, try again once it's done.",
+                    color=discord.Color.red(),
+                )
+            )
+            return
+        embed = discord.Embed(
+            title="Leaderboard ingested",
+            description=f"{count} players in {took:.1f}s",
+            color=discord.Color.green(),
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="sync")
+    @commands.is_owner()
+    async def sync(self, ctx: commands.Context):
+        """
+        Sync slash commands with Discord even if they look unchanged.
+        """
+        await self.bot.command_sync.sync(force=True)
+        embed = discord.Embed(
+            title="Synced",
+            description=f"{len(self.bot.tree.get_commands())} commands synced",
+            color=discord.Color.green(),
+        )
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="refresher")
+    @commands.is_owner()
+    async def refresher(self, ctx: commands.Context):
+        """
+        What the background player refresher has been doing.
+        """
+        refresher = self.bot.refresher
+        embed = discord.Embed(
+            title="Refresher",
+            description="\n".join(
+                f"{username} {time.format_relative(when)}"
+                for username, when in reversed(refresher.refreshed)
+            )
+            or "Nothing refreshed yet.",
+            color=discord.Color.green(),
+        )
+        embed.add_field(name="Tracked", value=f"{len(refresher.tracked)}")
+        embed.add_field(name="Budget", value=f"{refresher.budget}/min")
+        embed.add_field(name="Skipped (budget)", value=f"{refresher.skipped}")
+        embed.add_field(name="Failed", value=f"{refresher.failed}")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="metrics")
+    @commands.is_owner()
+    async def metrics(self, ctx: commands.Context):
+        """
+        Command latency, cache and upstream stats since startup.
+        """
+
+        def latency(histogram: metrics.Histogram, *labels: str) -> str:
+            p50, p95 = (histogram.quantile(q, *labels) for q in (0.5, 0.95))
+            if math.isnan(p50):
+                return "-"
+            return f"p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms"
+
+        embed = discord.Embed(title="Metrics", color=discord.Color.green())
+        commands_ = sorted(
+            metrics.COMMAND_LATENCY.series.items(), key=lambda item: -item[1].count
+        )[:10]
+        embed.add_field(
+            name="Commands",
+            value="\n".join(
+                f"{name}: {series.count}x, " f"{latency(metrics.COMMAND_LATENCY, name)}"
+                for (name,), series in commands_
+            )
+            or "-",
+            inline=False,
+        )
+        errors = sorted(
+            metrics.COMMAND_ERRORS.values.items(), key=lambda item: -item[1]
+        )
+        embed.add_field(
+            name="Errors",
+            value="\n".join(
+                f"{command} {error}: {count:.0f}"
+                for (command, error), count in errors[:10]
+            )
+            or "-",
+            inline=False,
+        )
+        stats = PlayerAPI.memory.stats
+        lookups = stats.hits + stats.stale + stats.misses
+        embed.add_field(
+            name="Player cache",
+            value=(
+                f"{stats.hits / lookups:.0%} hit, {stats.stale / lookups:.0%} stale, "
+                f"{stats.misses / lookups:.0%} miss of {lookups}\n"
+                if lookups
+                else ""
+            )
+            + f"{len(PlayerAPI.memory)} players, {PlayerAPI.memory.bytes / 2**20:.1f} MiB\n"
+            f"{PlayerAPI.unknown.stats.hits} unknown name hits",
+            inline=False,
+        )
+        embed.add_field(
+            name="TETR.IO",
+            value="\n".join(
+                f"{status}: {series.count}x, "
+                f"{latency(metrics.UPSTREAM_LATENCY, status)}"
+                for (status,), series in sorted(metrics.UPSTREAM_LATENCY.series.items())
+            )
+            + f"\nqueued {Request.limiter.depth()}, throttled {Request.limiter.throttled}x"
+            + "".join(
+                f"\n{priority.name.lower()} wait avg {wait.average * 1000:.0f}ms, "
+                f"max {wait.max * 1000:.0f}ms of {wait.count}"
+                for priority, wait in Request.limiter.waits.items()
+            ),
+            inline=False,
+        )
+        pool = self.bot.db.db
+        embed.add_field(
+            name="Database pool",
+            value=f"{pool.get_size() - pool.get_idle_size()} busy, "
+            f"{pool.get_idle_size()} idle, max {pool.get_max_size()}",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
     @commands.hybrid_command(name="raise")
     @commands.is_owner()
     async def raise_error(self, ctx: commands.Context):
@@ -1,6 +1,13 @@
+import asyncio
 import dataclasses
 import datetime
+import email.utils
 import enum
+import logging
+import os
+import random
+import sys
+import time
 import typing
 
 import aiohttp
@@ -8,16 +15,179 @@ import dateutil.parser
 import orjson
 import yarl
 
-from . import sqls
-from .errors import APIError
+from . import history, metrics, sqls
+from .cache import LRUCache, SingleFlight
+from .errors import APIError, UpstreamError
+from .ratelimit import Priority, Scheduler
+
+if typing.TYPE_CHECKING:
+    from .refresher import Refresher
+
+log = logging.getLogger("root.API")
+
+BASE_URL = yarl.URL("https://ch.tetr.io/api/users")
 
 
 class Request:
-    @staticmethod
-    async def get(url: str, headers: dict = None) -> dict:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+    """
+    Bot-lifetime HTTP client shared by every TETR.IO endpoint.
+    Call `start` on startup and `close` on shutdown, connections are kept alive and pooled in between.
+    """
+
+    session: typing.Optional[aiohttp.ClientSession] = None
+    retries: int = 3
+    backoff: float = 0.5
+    # every outbound request waits for a token, interactive commands ahead of background jobs
+    limiter: Scheduler = Scheduler(
+        rate=float(os.getenv("TETRIO_RATE", "5")),
+        burst=int(os.getenv("TETRIO_BURST", "10")),
+    )
+
+    @classmethod
+    async def start(
+        cls,
+        *,
+        limit: typing.Optional[int] = None,
+        limit_per_host: typing.Optional[int] = None,
+        dns_cache_ttl: typing.Optional[int] = None,
+        keepalive_timeout: typing.Optional[float] = None,
+        timeout: typing.Optional[float] = None,
+        connect_timeout: typing.Optional[float] = None,
+        retries: typing.Optional[int] = None,
+        backoff: typing.Optional[float] = None,
+    ) -> aiohttp.ClientSession:
+        if cls.session is not None and not cls.session.closed:
+            return cls.session
+        limit = int(os.getenv("HTTP_LIMIT", "100")) if limit is None else limit
+        limit_per_host = (
+            int(os.getenv("HTTP_LIMIT_PER_HOST", "20"))
+            if limit_per_host is None
+            else limit_per_host
+        )
+        dns_cache_ttl = (
+            int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+            if dns_cache_ttl is None
+            else dns_cache_ttl
+        )
+        keepalive_timeout = (
+            float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+            if keepalive_timeout is None
+            else keepalive_timeout
+        )
+        timeout = float(os.getenv("HTTP_TIMEOUT", "10")) if timeout is None else timeout
+        connect_timeout = (
+            float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+            if connect_timeout is None
+            else connect_timeout
+        )
+        cls.retries = (
+            int(os.getenv("HTTP_RETRIES", "3")) if retries is None else retries
+        )
+        cls.backoff = (
+            float(os.getenv("HTTP_BACKOFF", "0.5")) if backoff is None else backoff
+        )
+
+        cls.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=limit,
+                limit_per_host=limit_per_host,
+                ttl_dns_cache=dns_cache_ttl,
+                keepalive_timeout=keepalive_timeout,
+            ),
+            timeout=aiohttp.ClientTimeout(total=timeout, connect=connect_timeout),
+            headers={
+                "User-Agent": "osk-game (+https://github.com/timelessnesses/osk-game)"
+            },
+        )
+        return cls.session
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls.session is not None:
+            await cls.session.close()
+        cls.session = None
+
+    @classmethod
+    async def get(
+        cls,
+        url: str,
+        headers: dict = None,
+        *,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> dict:
+        """
+        Decoded JSON of `url`, connection errors, 429s and 5xx responses are retried.
+        Raises `UpstreamError` once the retries run out.
+        """
+        session = await cls.start()  # lazily started when used outside the bot
+        attempt = 0
+        while True:
+            await cls.limiter.acquire(priority)
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    metrics.UPSTREAM_LATENCY.observe(
+                        time.perf_counter() - started, str(response.status)
+                    )
+                    if response.status == 429 and attempt < cls.retries:
+                        # hold back every queued request, not just this one
+                        cls.limiter.pause(
+                            retry_after(response.headers.get("Retry-After"))
+                            or cls.backoff * 2**attempt
+                        )
+                        attempt += 1
+                        continue
+                    if response.status == 429 or response.status >= 500:
+                        if attempt >= cls.retries:
+                            # an upstream failure rather than an answer, callers mustn't cache it
+                            raise UpstreamError(
+                                f"TETR.IO answered with HTTP {response.status}"
+                            )
+                    else:
+                        return orjson.loads(await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, "error")
+                if attempt >= cls.retries:
+                    raise UpstreamError(
+                        f"TETR.IO unreachable: {type(error).__name__}"
+                    ) from error
+            # exponential backoff with jitter so retries don't hit upstream in lockstep
+            await asyncio.sleep(cls.backoff * 2**attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+def retry_after(value: typing.Optional[str]) -> typing.Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, which is either seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(
+        0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    )
+
+
+def _slotted(cls: type) -> type:
+    """
+    Rebuild a dataclass with `__slots__`, what `dataclass(slots=True)` does on Python 3.10+.
+    Decoded profiles are kept around by the thousands so the per-instance `__dict__` adds up.
+    """
+    fields = tuple(field.name for field in dataclasses.fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in fields and key not in ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = fields
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
 
 
 class Cache_Status(enum.Enum):
@@ -26,6 +196,7 @@ class Cache_Status(enum.Enum):
     AWAITED = "awaited"
 
 
+@_slotted
 @dataclasses.dataclass
 class Cache:
     status: Cache_Status
@@ -44,6 +215,7 @@ class Role(enum.Enum):
         return self.name.title()
 
 
+@_slotted
 @dataclasses.dataclass
 class Badge:
     id: str
@@ -75,6 +247,7 @@ class Rank(enum.Enum):
         return self.value if self.name != "unranked" else "Unranked"
 
 
+@_slotted
 @dataclasses.dataclass
 class League:
     gamesplayed: int
@@ -97,6 +270,7 @@ class League:
     percentile: float
 
 
+@_slotted
 @dataclasses.dataclass
 class User:
     _id: str
@@ -108,24 +282,51 @@ class User:
     xp: float
     gamesplayed: int
     gameswon: int
-    gametime: datetime.timedelta
+    gametime_seconds: typing.Optional[float]
     country: typing.Optional[str]
     badstanding: bool
     supporter: bool
     supporter_tier: int
     verified: bool
     league: typing.Optional[League]
-    avatar_revision: typing.Optional[yarl.URL]
-    banner_revision: typing.Optional[yarl.URL]
+    avatar_revision: typing.Optional[int]
+    banner_revision: typing.Optional[int]
     bio: typing.Optional[str]
     friend_count: int
 
+    # derived values are built on access instead of being stored on every profile
+
+    @property
+    def gametime(self) -> typing.Optional[datetime.timedelta]:
+        if self.gametime_seconds is None:
+            return None
+        return datetime.timedelta(seconds=self.gametime_seconds)
+
+    @property
+    def avatar_url(self) -> typing.Optional[yarl.URL]:
+        return self._user_content("avatars", self.avatar_revision)
+
+    @property
+    def banner_url(self) -> typing.Optional[yarl.URL]:
+        return self._user_content("banners", self.banner_revision)
 
+    def _user_content(
+        self, kind: str, revision: typing.Optional[int]
+    ) -> typing.Optional[yarl.URL]:
+        if not revision:
+            return None
+        return yarl.URL(
+            f"https://tetr.io/user-content/{kind}/{self._id}.jpg?rv={revision}"
+        )
+
+
+@_slotted
 @dataclasses.dataclass
 class Data:
     user: typing.Optional[User]
 
 
+@_slotted
 @dataclasses.dataclass
 class PlayerAPI:
     success: bool
@@ -133,142 +334,538 @@ class PlayerAPI:
     cache: typing.Optional[Cache]
     data: typing.Optional[Data]
 
+    min_ttl: typing.ClassVar[float] = float(os.getenv("CACHE_MIN_TTL", "60"))
+    # how long past expiry a player may still be served while it is refreshed in the background
+    stale_ttl: typing.ClassVar[float] = float(os.getenv("CACHE_STALE_TTL", "300"))
+    # decoded players keyed by lowercased username with their _id as an alias,
+    # entries never outlive the Postgres row they came from
+    memory: typing.ClassVar["LRUCache[PlayerAPI]"] = LRUCache(
+        max_entries=int(os.getenv("PLAYER_CACHE_MAX_ENTRIES", "10000")),
+        max_bytes=int(os.getenv("PLAYER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
+    # how long a username TETR.IO doesn't know (typo, deleted account) is answered from
+    # the cache with its error instead of being asked about again
+    negative_ttl: typing.ClassVar[float] = float(os.getenv("NEGATIVE_CACHE_TTL", "120"))
+    # upstream error of recently failed lookups keyed by lowercased username
+    unknown: typing.ClassVar["LRUCache[str]"] = LRUCache(
+        max_entries=int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "10000"))
+    )
+    # lookups currently running, concurrent lookups of one player share a single fetch
+    inflight: typing.ClassVar["SingleFlight[PlayerAPI]"] = SingleFlight()
+    # set while the bot's background refresher runs, stale entries are only served then
+    refresher: typing.ClassVar[typing.Optional["Refresher"]] = None
+
     @classmethod
-    async def get_player(cls, username: str) -> "PlayerAPI":
-        db = sqls.EasySQL()
-        await db.connect()
-        cache = await db.fetch("SELECT * FROM cache WHERE username = $1", username)
-        base_url = yarl.URL("https://ch.tetr.io/api/users")
-        result = None
-        if cache:
-            print("cached response")
-            print(cache)
-            result: dict = orjson.loads(cache[username.lower()].encode("utf-8"))
-            if not result["success"]:
-                response = await Request.get(base_url / username)
-                if not response["success"]:
-                    raise APIError(result["error"])
-                await db.execute(
-                    "DELETE FROM cache WHERE username = $1", username.lower()
-                )
-                await db.execute(
-                    "INSERT INTO cache(username, data) VALUES($1, $2)",
-                    username.lower(),
-                    orjson.dumps(response).decode("utf-8"),
-                )
-                result = response
-        else:
-            print("uncached response")
-            result = await Request.get(base_url / username)
-            await db.execute(
-                "INSERT INTO cache(username, data) VALUES($1, $2)",
-                username.lower(),
-                orjson.dumps(result).decode("utf-8"),
-            )
+    async def get_player(cls, username: str, db: sqls.EasySQL) -> "PlayerAPI":
+        """
+        Get a player from the cache or TETR.IO.
+        `db` is the bot's shared connection pool (`bot.db`).
+        Raises `APIError` with TETR.IO's reason when the player doesn't exist, failures
+        are cached for `negative_ttl` seconds. `UpstreamError` when TETR.IO is down.
+        """
+        username = username.strip().lower()
+        if cls.refresher is not None:
+            cls.refresher.track(username)
+        player = cls._recall(username)
+        if player is not None:
+            return player
+        return await cls.inflight.do(username, lambda: cls._load(username, db))
 
-        args = result
-        args["cache"]["cached_at"] = datetime.datetime.fromtimestamp(
-            args["cache"]["cached_at"] / 1000
-            if args["cache"]["cached_at"]
-            else datetime.datetime.now().timestamp()
-        )
-        args["data"]["user"]["league"]["glicko"] = args["data"]["user"]["league"].get(
-            "glicko", None
-        )
-        args["data"]["user"]["league"]["rd"] = args["data"]["user"]["league"].get(
-            "rd", None
-        )
-        args["data"]["user"]["league"]["apm"] = args["data"]["user"]["league"].get(
-            "apm", None
-        )
-        args["data"]["user"]["league"]["pps"] = args["data"]["user"]["league"].get(
-            "pps", None
-        )
-        args["data"]["user"]["league"]["vs"] = args["data"]["user"]["league"].get(
-            "vs", None
-        )
-        args["cache"]["cached_until"] = datetime.datetime.fromtimestamp(
-            args["cache"]["cached_until"] / 1000
-            if args["cache"]["cached_until"]
-            else datetime.datetime.now().timestamp()
-        )
-        args["data"]["user"]["supporter"] = args["data"]["user"].get(
-            "supporter", False
-        )  # wow osk
-        args["data"]["user"]["friend_count"] = args["data"]["user"].get(
-            "friend_count", 0
-        )  # wow osk
-        args["data"]["user"]["bio"] = args["data"]["user"].get("bio", None)
-        args["cache"]["status"] = Cache_Status(args["cache"]["status"])
-        args["data"]["user"]["botmaster"] = (
-            args["data"]["user"]["botmaster"]
-            if args["data"]["user"].get("botmaster", None)
-            else None
-        )
-        args["data"]["user"]["badstanding"] = (
-            args["data"]["user"]["badstanding"]
-            if args["data"]["user"].get("badstanding", None)
-            else None
+    @classmethod
+    async def refresh(
+        cls,
+        username: str,
+        db: sqls.EasySQL,
+        *,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> "PlayerAPI":
+        """
+        Refetch a player from TETR.IO whether or not the cached copy is still fresh.
+        """
+        username = username.strip().lower()
+        # keyed apart from lookups, so a lookup never waits behind a background fetch
+        # and a refresh never settles for a lookup's cached row
+        return await cls.inflight.do(
+            f"refresh:{username}", lambda: cls._refetch(username, db, priority)
         )
-        args["data"]["user"]["gametime"] = (
-            datetime.timedelta(seconds=args["data"]["user"]["gametime"])
-            if args["data"]["user"].get("gametime", None)
-            else None
+
+    @classmethod
+    async def get_players(
+        cls,
+        usernames: typing.Iterable[str],
+        db: sqls.EasySQL,
+        *,
+        concurrency: typing.Optional[int] = None,
+    ) -> typing.Dict[str, "PlayerAPI"]:
+        """
+        Get many players at once, keyed by lowercased username.
+        Cache hits take one query, misses are fetched from TETR.IO at most `concurrency`
+        at a time and written back in one upsert. Players TETR.IO doesn't know, or that
+        couldn't be fetched, are left out.
+        """
+        usernames = list(
+            dict.fromkeys(username.strip().lower() for username in usernames)
         )
-        args["error"] = args["error"] if args.get("error", None) else None
-        args["cache"] = Cache(**args["cache"])
-        new_badge_info = []
-        for badge in args["data"]["user"]["badges"]:
-            if not badge.get("ts", None):
-                badge["ts"] = None
-            else:
-                badge["ts"] = timestring_to_datetime(badge["ts"])
-            new_badge_info.append(badge)
-        args["data"]["user"]["badges"] = new_badge_info
-        args["data"]["user"]["badges"] = [
-            Badge(**badge) for badge in args["data"]["user"]["badges"]
+        players: typing.Dict[str, PlayerAPI] = {}
+        failed: typing.Set[str] = set()
+        for username in usernames:
+            if cls.refresher is not None:
+                cls.refresher.track(username)
+            try:
+                player = cls._recall(username)
+            except APIError:
+                failed.add(username)
+                continue
+            if player is not None:
+                players[username] = player
+
+        missing = [
+            username
+            for username in usernames
+            if username not in players and username not in failed
+        ]
+        if missing:
+            for row in await db.fetchall(
+                """
+                SELECT username, data, expires_at, pg_column_size(data) AS size FROM cache
+                WHERE username = ANY($1::text[])
+                AND expires_at > now() - make_interval(secs => $2)
+                """,
+                missing,
+                cls._grace(),
+            ):
+                if cls._expired_failure(row):
+                    continue
+                try:
+                    players[row["username"]] = cls._from_row(row["username"], row)
+                except APIError:
+                    failed.add(row["username"])
+
+        missing = [
+            username
+            for username in usernames
+            if username not in players and username not in failed
         ]
-        args["data"]["user"]["ts"] = (
-            timestring_to_datetime(args["data"]["user"]["ts"])
-            if args["data"]["user"].get("ts", None)
-            else None
+        if missing:
+            semaphore = asyncio.Semaphore(
+                int(os.getenv("PLAYER_FETCH_CONCURRENCY", "8"))
+                if concurrency is None
+                else concurrency
+            )
+
+            fetched: typing.List[tuple] = []
+
+            async def load(username: str) -> "PlayerAPI":
+                async with semaphore:
+                    row = await cls._fetch(username)
+                fetched.append(row)
+                return cls._settle(row)
+
+            # through `inflight` like single lookups, a name already being fetched is
+            # joined rather than fetched twice, and only what was fetched here is stored
+            results = await asyncio.gather(
+                *(
+                    cls.inflight.do(username, lambda username=username: load(username))
+                    for username in missing
+                ),
+                return_exceptions=True,
+            )
+            await cls._store(db, fetched)
+            for username, result in zip(missing, results):
+                if isinstance(result, PlayerAPI):
+                    players[username] = result
+                elif isinstance(result, UpstreamError):
+                    log.warning(f"Failed to fetch {username}: {result.error}")
+                elif not isinstance(result, APIError):
+                    log.warning(f"Failed to fetch {username}", exc_info=result)
+
+        return {
+            username: players[username] for username in usernames if username in players
+        }
+
+    @classmethod
+    async def _load(cls, username: str, db: sqls.EasySQL) -> "PlayerAPI":
+        row = await db.fetchrow(
+            """
+            SELECT data, expires_at, pg_column_size(data) AS size FROM cache
+            WHERE username = $1 AND expires_at > now() - make_interval(secs => $2)
+            """,
+            username,
+            cls._grace(),
         )
-        args["data"]["user"]["league"]["prev_rank"] = (
-            Rank(args["data"]["user"]["league"]["prev_rank"])
-            if args["data"]["user"]["league"]["prev_rank"]
-            else None
+        if row is not None and not cls._expired_failure(row):
+            return cls._from_row(username, row)
+        return await cls._refetch(username, db, Priority.INTERACTIVE)
+
+    @classmethod
+    async def _refetch(
+        cls, username: str, db: sqls.EasySQL, priority: Priority
+    ) -> "PlayerAPI":
+        fetched = await cls._fetch(username, priority)
+        await cls._store(db, [fetched])
+        return cls._settle(fetched)
+
+    @classmethod
+    async def _fetch(
+        cls, username: str, priority: Priority = Priority.INTERACTIVE
+    ) -> typing.Tuple[str, dict, bytes, datetime.datetime, datetime.datetime]:
+        """
+        Fetch a player from TETR.IO as a cache row (username, result, raw, fetched_at, expires_at).
+        Unsuccessful responses are returned too, so they can be cached for `negative_ttl`.
+        """
+        result = await Request.get(BASE_URL / username, priority=priority)
+        fetched_at = datetime.datetime.now(datetime.timezone.utc)
+        return (
+            username,
+            result,
+            orjson.dumps(result),
+            fetched_at,
+            cls.expires_at(result, fetched_at)
+            if result["success"]
+            else fetched_at + datetime.timedelta(seconds=cls.negative_ttl),
         )
-        args["data"]["user"]["league"]["rank"] = Rank(
-            args["data"]["user"]["league"]["rank"]
+
+    @staticmethod
+    async def _store(db: sqls.EasySQL, rows: typing.List[tuple]) -> None:
+        if not rows:
+            return
+        usernames, _, raws, fetched_ats, expires_ats = zip(*rows)
+        await db.execute(
+            """
+            INSERT INTO cache(username, data, fetched_at, expires_at)
+            SELECT * FROM unnest($1::text[], $2::jsonb[], $3::timestamptz[], $4::timestamptz[])
+            ON CONFLICT (username) DO UPDATE
+            SET data = EXCLUDED.data,
+                fetched_at = EXCLUDED.fetched_at,
+                expires_at = EXCLUDED.expires_at
+            """,
+            usernames,
+            raws,
+            fetched_ats,
+            expires_ats,
         )
-        args["data"]["user"]["league"]["next_rank"] = (
-            Rank(args["data"]["user"]["league"]["next_rank"])
-            if args["data"]["user"]["league"]["next_rank"]
-            else None
+        await history.record(
+            db, ((row[3], row[1]) for row in rows if row[1]["success"])
         )
-        args["data"]["user"]["league"]["percentile_rank"] = Rank(
-            args["data"]["user"]["league"]["percentile_rank"]
+
+    @classmethod
+    def _grace(cls) -> float:
+        return cls.stale_ttl if cls.refresher is not None else 0.0
+
+    @classmethod
+    def _settle(cls, fetched: tuple) -> "PlayerAPI":
+        """
+        Remember a freshly fetched cache row and decode it, or raise its error.
+        """
+        username, result, raw, _, expires_at = fetched
+        if not result["success"]:
+            cls._remember_failure(username, result["error"], expires_at)
+            raise APIError(result["error"])
+        player = cls.from_payload(result)
+        cls._remember(username, player, expires_at, len(raw))
+        return player
+
+    @classmethod
+    def _recall(cls, username: str) -> typing.Optional["PlayerAPI"]:
+        error = cls.unknown.get(username)
+        if error is not None:
+            raise APIError(error)
+        cached = cls.memory.peek(username)
+        if cached is None:
+            return None
+        player, fresh = cached
+        if not fresh:
+            if cls.refresher is None:
+                return None
+            cls.refresher.revalidate(username)  # stale while revalidate
+        return player
+
+    @classmethod
+    def _from_row(cls, username: str, row: typing.Mapping) -> "PlayerAPI":
+        if not row["data"]["success"]:
+            cls._remember_failure(username, row["data"]["error"], row["expires_at"])
+            raise APIError(row["data"]["error"])
+        player = cls.from_payload(row["data"])
+        cls._remember(username, player, row["expires_at"], row["size"])
+        if (
+            row["expires_at"] <= datetime.datetime.now(datetime.timezone.utc)
+            and cls.refresher is not None
+        ):
+            cls.refresher.revalidate(username)
+        return player
+
+    @staticmethod
+    def _expired_failure(row: typing.Mapping) -> bool:
+        # failures are never served stale, the name may have been registered since
+        return not row["data"]["success"] and row[
+            "expires_at"
+        ] <= datetime.datetime.now(datetime.timezone.utc)
+
+    @classmethod
+    def _remember_failure(
+        cls, username: str, error: str, expires_at: datetime.datetime
+    ) -> None:
+        cls.memory.pop(username)
+        cls.unknown.set(
+            username,
+            error,
+            ttl=(
+                expires_at - datetime.datetime.now(datetime.timezone.utc)
+            ).total_seconds(),
         )
-        args["data"]["user"]["league"] = League(**args["data"]["user"]["league"])
-        args["data"]["user"]["avatar_revision"] = (
-            yarl.URL(
-                f'https://tetr.io/user-content/avatars/{args["data"]["user"]["_id"]}.jpg?rv={args["data"]["user"]["avatar_revision"]}'
-            )
-            if args["data"]["user"].get("avatar_revision", None)
-            else None
+
+    @classmethod
+    def _remember(
+        cls,
+        username: str,
+        player: "PlayerAPI",
+        expires_at: datetime.datetime,
+        size: int,
+    ) -> None:
+        cls.unknown.pop(username)
+        cls.memory.set(
+            username,
+            player,
+            ttl=(
+                expires_at - datetime.datetime.now(datetime.timezone.utc)
+            ).total_seconds(),
+            grace=cls.stale_ttl,
+            weight=size,
+            aliases=(player.data.user._id, player.data.user.username.lower()),
         )
-        args["data"]["user"]["banner_revision"] = (
-            yarl.URL(
-                f'https://tetr.io/user-content/banners/{args["data"]["user"]["_id"]}.jpg?rv={args["data"]["user"]["banner_revision"]}'
-            )
-            if args["data"]["user"].get("banner_revision", None)
-            else None
+
+    @classmethod
+    def expires_at(
+        cls, payload: dict, fetched_at: datetime.datetime
+    ) -> datetime.datetime:
+        """
+        When a freshly fetched payload stops being served from the cache.
+        Upstream `cache.cached_until` is honored but never shorter than `min_ttl` seconds.
+        """
+        floor = fetched_at + datetime.timedelta(seconds=cls.min_ttl)
+        cached_until = (payload.get("cache") or {}).get("cached_until")
+        if not cached_until:
+            return floor
+        return max(
+            floor,
+            datetime.datetime.fromtimestamp(
+                cached_until / 1000, tz=datetime.timezone.utc
+            ),
         )
 
-        args["data"]["user"] = User(**args["data"]["user"])
-        args["data"] = Data(**args["data"])
-        return cls(**args)
+    @classmethod
+    def from_json(cls, raw: typing.Union[bytes, str]) -> "PlayerAPI":
+        """
+        Decode a raw `/api/users/<name>` response body.
+        """
+        return _decode_player(orjson.loads(raw))
+
+    @classmethod
+    def from_payload(cls, result: dict) -> "PlayerAPI":
+        """
+        Decode an already parsed `/api/users/<name>` response, `result` is left untouched.
+        """
+        return _decode_player(result)
+
+
+def timestring_to_datetime(time_string: str) -> datetime.datetime:
+    try:
+        # fromisoformat only understands the "Z" suffix from 3.11 onwards
+        return datetime.datetime.fromisoformat(time_string.replace("Z", "+00:00"))
+    except ValueError:
+        return dateutil.parser.parse(time_string)
+
+
+def millis_to_datetime(millis: typing.Optional[float]) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(
+        millis / 1000 if millis else datetime.datetime.now().timestamp()
+    )
+
+
+# Decoding is driven by one schema per dataclass instead of rewriting the payload in place.
+# A field is (name, default, convert), convert is skipped when the value is None.
+# A derived field's convert gets the whole object instead of its own value.
+
+
+class _Field(typing.NamedTuple):
+    name: str
+    default: typing.Any = None
+    convert: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+    derived: bool = False
+
+
+def _decoder(
+    cls: type, *fields: _Field
+) -> typing.Callable[[typing.Mapping[str, typing.Any]], typing.Any]:
+    assert [field.name for field in fields] == [
+        field.name for field in dataclasses.fields(cls)
+    ], f"{cls.__name__} schema is out of sync"
+
+    def decode(source: typing.Mapping[str, typing.Any]) -> typing.Any:
+        values = []
+        get = source.get
+        for name, default, convert, derived in fields:
+            if derived:
+                values.append(convert(source))
+                continue
+            value = get(name, default)
+            if convert is not None and value is not None:
+                value = convert(value)
+            values.append(value)
+        return cls(*values)
+
+    return decode
+
+
+def _enum(enum_cls: typing.Type[enum.Enum]) -> typing.Callable[[str], enum.Enum]:
+    return {member.value: member for member in enum_cls}.__getitem__
+
+
+_decode_cache = _decoder(
+    Cache,
+    _Field("status", convert=_enum(Cache_Status)),
+    _Field(
+        "cached_at",
+        derived=True,
+        convert=lambda cache: millis_to_datetime(cache.get("cached_at")),
+    ),
+    _Field(
+        "cached_until",
+        derived=True,
+        convert=lambda cache: millis_to_datetime(cache.get("cached_until")),
+    ),
+)
+_decode_badge = _decoder(
+    Badge,
+    _Field("id", convert=sys.intern),
+    _Field("label", convert=sys.intern),
+    _Field("ts", convert=timestring_to_datetime),
+)
+_decode_league = _decoder(
+    League,
+    _Field("gamesplayed", 0),
+    _Field("gameswon", 0),
+    _Field("rating", -1),
+    _Field("glicko"),
+    _Field("rd"),
+    _Field("rank", "z", _enum(Rank)),
+    _Field("apm"),
+    _Field("pps"),
+    _Field("vs"),
+    _Field("decaying", False),
+    _Field("standing", -1),
+    _Field("standing_local", -1),
+    _Field("prev_rank", convert=_enum(Rank)),
+    _Field("prev_at", -1),
+    _Field("next_rank", convert=_enum(Rank)),
+    _Field("next_at", -1),
+    _Field("percentile_rank", "z", _enum(Rank)),
+    _Field("percentile", 0),
+)
+_decode_user = _decoder(
+    User,
+    _Field("_id"),
+    _Field("username"),
+    _Field("role", "user", _enum(Role)),
+    _Field("ts", convert=timestring_to_datetime),
+    _Field("botmaster"),
+    _Field("badges", (), lambda badges: [_decode_badge(badge) for badge in badges]),
+    _Field("xp", 0),
+    _Field("gamesplayed", 0),
+    _Field("gameswon", 0),
+    _Field("gametime_seconds", derived=True, convert=lambda user: user.get("gametime")),
+    _Field("country", convert=sys.intern),
+    _Field("badstanding", False),
+    _Field("supporter", False),
+    _Field("supporter_tier", 0),
+    _Field("verified", False),
+    _Field("league", convert=_decode_league),
+    _Field("avatar_revision"),
+    _Field("banner_revision"),
+    _Field("bio"),
+    _Field("friend_count", 0),
+)
+_decode_data = _decoder(Data, _Field("user", convert=_decode_user))
+_decode_player = _decoder(
+    PlayerAPI,
+    _Field("success", False),
+    _Field("error"),
+    _Field("cache", convert=_decode_cache),
+    _Field("data", convert=_decode_data),
+)
+
+
+def _player_cache_lookups() -> typing.Dict[typing.Tuple[str, ...], float]:
+    stats = PlayerAPI.memory.stats
+    return {
+        ("hit",): stats.hits,
+        ("stale",): stats.stale,
+        ("miss",): stats.misses,
+        ("unknown",): PlayerAPI.unknown.stats.hits,
+    }
+
+
+metrics.callback(
+    "osk_player_cache_lookups_total",
+    "In-memory player cache lookups, 'unknown' ones hit the negative cache.",
+    _player_cache_lookups,
+    kind="counter",
+    labels=("result",),
+)
+metrics.callback(
+    "osk_player_cache_evictions_total",
+    "Players evicted from memory to stay within the cache bounds.",
+    lambda: PlayerAPI.memory.stats.evictions,
+    kind="counter",
+)
+metrics.callback(
+    "osk_player_cache_bytes",
+    "Approximate size of the players held in memory.",
+    lambda: PlayerAPI.memory.bytes,
+)
+metrics.callback(
+    "osk_player_fetches_coalesced_total",
+    "Player lookups that joined a fetch already in flight.",
+    lambda: PlayerAPI.inflight.coalesced,
+    kind="counter",
+)
+metrics.callback(
+    "osk_tetrio_queue_depth",
+    "Requests waiting for a rate limit token.",
+    lambda: Request.limiter.depth(),
+)
+
+
+def _limiter_waits(stat: str) -> typing.Dict[typing.Tuple[str, ...], float]:
+    return {
+        (priority.name.lower(),): getattr(wait, stat)
+        for priority, wait in Request.limiter.waits.items()
+    }
 
 
-def timestring_to_datetime(time_string) -> datetime:
-    return dateutil.parser.parse(time_string)
+metrics.callback(
+    "osk_tetrio_tokens_total",
+    "Rate limit tokens taken, whether or not the request had to wait for one.",
+    lambda: _limiter_waits("count"),
+    kind="counter",
+    labels=("priority",),
+)
+metrics.callback(
+    "osk_tetrio_wait_seconds_total",
+    "Time requests spent waiting for a rate limit token.",
+    lambda: _limiter_waits("total"),
+    kind="counter",
+    labels=("priority",),
+)
+metrics.callback(
+    "osk_tetrio_wait_max_seconds",
+    "Longest wait for a rate limit token.",
+    lambda: _limiter_waits("max"),
+    labels=("priority",),
+)
+metrics.callback(
+    "osk_tetrio_throttled_total",
+    "Times TETR.IO answered 429 and every request was paused.",
+    lambda: Request.limiter.throttled,
+    kind="counter",
+)
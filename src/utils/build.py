@@ -0,0 +1,128 @@
+"""
+Build metadata (commit, local changes, whether it's behind upstream), worked out once at
+startup. Taken from the environment or a file baked at deploy time when available, git is
+only asked as a last resort and without blocking the event loop.
+
+    python -m src.utils.build  # write build.json for a deploy
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import pathlib
+import typing
+
+ROOT = pathlib.Path(__file__).parent.parent.parent
+
+# checked in order, the first one set wins (the Heroku ones come with dyno metadata)
+COMMIT_VARIABLES = ("BUILD_COMMIT", "HEROKU_SLUG_COMMIT", "SOURCE_VERSION")
+
+
+@dataclasses.dataclass(frozen=True)
+class Build:
+    commit: typing.Optional[str] = None
+    # None when unknown
+    modified: typing.Optional[bool] = None
+    behind: typing.Optional[bool] = None
+    # where this came from: env, file, git or none
+    source: str = "none"
+
+    @property
+    def short(self) -> str:
+        return self.commit[:7] if self.commit else "unknown"
+
+    @property
+    def version(self) -> str:
+        if self.modified:
+            return f"{self.short} (modified)"
+        if self.behind:
+            return f"old ({self.short}) - not up to date"
+        return f"latest ({self.short})"
+
+
+_build: typing.Optional[Build] = None
+
+
+def current() -> Build:
+    """
+    The build `load` found, an unknown one before that.
+    """
+    return _build or Build()
+
+
+def from_env() -> typing.Optional[Build]:
+    for variable in COMMIT_VARIABLES:
+        commit = os.getenv(variable)
+        if commit:
+            return Build(commit.strip(), False, False, "env")
+    return None
+
+
+def from_file(
+    path: typing.Union[str, os.PathLike, None] = None
+) -> typing.Optional[Build]:
+    path = pathlib.Path(path or os.getenv("BUILD_FILE", ROOT / "build.json"))
+    try:
+        data = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return Build(data.get("commit"), data.get("modified"), data.get("behind"), "file")
+
+
+async def _git(*args: str) -> typing.Optional[str]:
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            *args,
+            cwd=ROOT,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:  # no git
+        return None
+    stdout, _ = await process.communicate()
+    return stdout.decode() if process.returncode == 0 else None
+
+
+async def from_git() -> typing.Optional[Build]:
+    commit, status = await asyncio.gather(
+        _git("rev-parse", "HEAD"), _git("status", "--porcelain=v2", "--branch")
+    )
+    if commit is None:
+        return None
+    modified = behind = None
+    if status is not None:
+        # "1 ..."/"2 ..." are changed tracked files, "# branch.ab +<ahead> -<behind>"
+        # only shows up with an upstream
+        modified = any(line[:2] in ("1 ", "2 ") for line in status.splitlines())
+        behind = any(
+            line.startswith("# branch.ab ") and not line.endswith(" -0")
+            for line in status.splitlines()
+        )
+    return Build(commit.strip(), modified, behind, "git")
+
+
+async def load() -> Build:
+    """
+    Work out the build once, later calls return the same one.
+    """
+    global _build
+    if _build is None:
+        _build = from_env() or from_file() or await from_git() or Build()
+    return _build
+
+
+def main() -> None:
+    build = asyncio.run(from_git()) or Build()
+    path = pathlib.Path(os.getenv("BUILD_FILE", ROOT / "build.json"))
+    path.write_text(
+        json.dumps(
+            {"commit": build.commit, "modified": build.modified, "behind": build.behind}
+        )
+    )
+    print(f"Wrote {build.version} to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+In-process cache tier that sits in front of the Postgres player cache.
+"""
+
+import asyncio
+import collections
+import dataclasses
+import time
+import typing
+
+V = typing.TypeVar("V")
+
+
+@dataclasses.dataclass
+class Stats:
+    hits: int = 0
+    stale: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+@dataclasses.dataclass
+class _Entry(typing.Generic[V]):
+    value: V
+    expires: float
+    stale_until: float
+    weight: int
+    aliases: typing.Tuple[str, ...]
+
+
+class LRUCache(typing.Generic[V]):
+    """
+    Least recently used cache with a per-entry TTL.
+    Bounded by both entry count and total weight (roughly bytes), an entry can also be
+    reached through aliases which don't count towards either bound.
+    An entry can outlive its TTL by a grace period during which only `peek` returns it, as stale.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: typing.Optional[int] = None,
+        *,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.stats = Stats()
+        self.bytes = 0
+        self._entries: "collections.OrderedDict[str, _Entry[V]]" = (
+            collections.OrderedDict()
+        )
+        self._aliases: typing.Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not None
+
+    def _resolve(self, key: str) -> str:
+        return self._aliases.get(key, key)
+
+    def _lookup(self, key: str) -> typing.Optional[_Entry[V]]:
+        key = self._resolve(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry.stale_until <= self.clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: str) -> _Entry[V]:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.weight
+        for alias in entry.aliases:
+            if self._aliases.get(alias) == key:
+                del self._aliases[alias]
+        return entry
+
+    def get(self, key: str, default: typing.Optional[V] = None) -> typing.Optional[V]:
+        entry = self._lookup(key)
+        if entry is None or entry.expires <= self.clock():
+            self.stats.misses += 1
+            return default
+        self._entries.move_to_end(self._resolve(key))
+        self.stats.hits += 1
+        return entry.value
+
+    def peek(self, key: str) -> typing.Optional[typing.Tuple[V, bool]]:
+        """
+        `(value, fresh)` for an entry that is either fresh or within its grace period.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(self._resolve(key))
+        fresh = entry.expires > self.clock()
+        if fresh:
+            self.stats.hits += 1
+        else:
+            self.stats.stale += 1
+        return entry.value, fresh
+
+    def set(
+        self,
+        key: str,
+        value: V,
+        *,
+        ttl: float,
+        grace: float = 0.0,
+        weight: int = 1,
+        aliases: typing.Iterable[str] = (),
+    ) -> None:
+        if ttl + grace <= 0:
+            return
+        key = self._resolve(key)
+        if key in self._entries:
+            self._remove(key)
+        aliases = tuple(alias for alias in aliases if alias != key)
+        for alias in aliases:
+            if alias in self._entries:
+                self._remove(alias)
+            self._aliases[alias] = key
+        expires = self.clock() + ttl
+        self._entries[key] = _Entry(value, expires, expires + grace, weight, aliases)
+        self.bytes += weight
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None
+            and self.bytes > self.max_bytes
+            and len(self._entries) > 1
+        ):
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def pop(self, key: str, default: typing.Optional[V] = None) -> typing.Optional[V]:
+        key = self._resolve(key)
+        if key not in self._entries:
+            return default
+        return self._remove(key).value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._aliases.clear()
+        self.bytes = 0
+
+
+class SingleFlight(typing.Generic[V]):
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+    Every caller gets the task's result or exception, and a cancelled caller doesn't
+    cancel the call for everyone else.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: typing.Dict[str, "asyncio.Task[V]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: typing.Callable[[], typing.Awaitable[V]]) -> V:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda task: self._forget(key, task))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[V]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # every waiter may be gone, don't warn about it
@@ -1,4 +1,14 @@
 import math
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+# constant terms of the Est. TR formula in formula.txt
+_TR_GLICKO_OFFSET = 1500 - 186.68
+_TR_SQRT_RD_SCALE = math.sqrt(15.9056943314)
+_TR_SQRT_RD_BASE = math.sqrt(3527584.25978)
+_TR_HALF_LN10 = math.log(10) / 2
 
 # waste kwargs for ignore any other arguments and yeah im too lazy
 
@@ -47,24 +57,69 @@ def weighted_app(apm: float, pps: float, vs: float, **waste: dict) -> float:
     return app(apm, pps) - 5 * math.tan((cheese_index(vs, apm, pps) / -30) + 1)
 
 
-def estimated_tr(pps: float, apm: float, vs: float, rd: float, **waste: dict) -> float:
-    return 25000 / (
-        1
-        + (
-            10
-            ^ (
-                (
-                    (
-                        1500
-                        - (
-                            4.0867
-                            * (pps * 90 + app * 290 + ds_piece(vs, apm, pps) * 750)
-                            + 186.68
-                        )
-                    )
-                    * 3.14159
-                )
-                / ((15.9056943314 * (rd ^ 2) + 3527584.25978) ^ 0.5)
-            )
+def batch(
+    apm: npt.ArrayLike,
+    pps: npt.ArrayLike,
+    vs: npt.ArrayLike,
+    rd: typing.Optional[npt.ArrayLike] = None,
+    **waste: dict,
+) -> typing.Dict[str, np.ndarray]:
+    """
+    Every derived stat for many players at once, keyed by the name of the scalar function.
+    Shared subterms are computed once per batch, zero pps/apm gives NaN instead of inf or an exception.
+    `estimated_tr` is only included when `rd` is given.
+    """
+    apm = np.asarray(apm, dtype=np.float64)
+    pps = np.asarray(pps, dtype=np.float64)
+    vs = np.asarray(vs, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_pps = np.where(pps == 0, np.nan, pps)
+        safe_apm = np.where(apm == 0, np.nan, apm)
+        app_ = apm / (safe_pps * 60)
+        ds_second_ = (vs / 100) - (apm / 60)
+        ds_piece_ = ds_second_ / safe_pps
+        cheese_index_ = (
+            (ds_piece_ * 150) + (((vs / safe_apm) - 2) * 50) + ((0.6 - app_) * 125)
         )
-    )
+        garbage_efficiency_ = ((app_ * ds_second_) / safe_pps) * 2
+        result = {
+            "app": app_,
+            "ds_second": ds_second_,
+            "ds_piece": ds_piece_,
+            "app_ds_piece": ds_piece_ + app_,
+            "cheese_index": cheese_index_,
+            "garbage_efficiency": garbage_efficiency_,
+            "area": apm
+            + pps * 45
+            + vs * 0.444
+            + app_ * 185
+            + ds_second_ * 175
+            + ds_piece_ * 450
+            + garbage_efficiency_ * 315,
+            "weighted_app": app_ - 5 * np.tan((cheese_index_ / -30) + 1),
+        }
+        if rd is not None:
+            result["estimated_tr"] = _estimated_tr(
+                safe_pps, app_, ds_piece_, np.asarray(rd, dtype=np.float64)
+            )
+    return result
+
+
+def batch_table(table: typing.Any) -> typing.Dict[str, np.ndarray]:
+    """
+    `batch` for a structured array or a mapping of columns (`apm`, `pps`, `vs` and optionally `rd`).
+    """
+    names = table.dtype.names if isinstance(table, np.ndarray) else table.keys()
+    return batch(**{name: table[name] for name in names})
+
+
+def estimated_tr(pps: float, apm: float, vs: float, rd: float, **waste: dict) -> float:
+    return _estimated_tr(pps, app(apm, pps), ds_piece(vs, apm, pps), rd)
+
+
+def _estimated_tr(pps, app_, ds_piece_, rd):
+    # 25000 / (1 + 10^x) rewritten as a tanh so huge |x| can't overflow, and
+    # sqrt(a * rd^2 + b) as a hypot so huge rd can't overflow either
+    glicko = _TR_GLICKO_OFFSET - 4.0867 * (pps * 90 + app_ * 290 + ds_piece_ * 750)
+    x = glicko * 3.14159 / np.hypot(_TR_SQRT_RD_SCALE * rd, _TR_SQRT_RD_BASE)
+    return 12500 * (1 - np.tanh(x * _TR_HALF_LN10))
@@ -0,0 +1,180 @@
+"""
+Chart rendering in worker processes so matplotlib never blocks the event loop.
+Charts come back as PNG bytes (wrap them in `discord.File(io.BytesIO(png), ...)`) and are
+cached by player, data version and chart kind.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import typing
+
+import numpy as np
+
+from . import calc_stats
+from .cache import LRUCache, SingleFlight
+
+# axis label, `calc_stats.batch` key (or raw league field) and the value drawn at the rim
+RADAR_AXES = (
+    ("APM", "apm", 150),
+    ("PPS", "pps", 3),
+    ("VS", "vs", 300),
+    ("APP", "app", 1),
+    ("DS/Second", "ds_second", 1),
+    ("DS/Piece", "ds_piece", 0.5),
+    ("APP+DS/Piece", "app_ds_piece", 1.5),
+    ("Garbage Effi.", "garbage_efficiency", 0.5),
+)
+
+# fork where there is one, Windows only has spawn
+START_METHOD = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _init_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _png(figure: typing.Any) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(figure)
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=100, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def render_progression(
+    points: typing.Sequence[typing.Tuple[float, float]], title: str = "TR progression"
+) -> bytes:
+    """
+    Line chart of `(unix timestamp, rating)` points.
+    """
+    import datetime
+
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 4))
+    axes = figure.add_subplot()
+    axes.plot(
+        [datetime.datetime.fromtimestamp(ts) for ts, _ in points],
+        [rating for _, rating in points],
+        marker="o",
+        markersize=3,
+    )
+    axes.set_title(title)
+    axes.set_ylabel("TR")
+    axes.grid(alpha=0.3)
+    figure.autofmt_xdate()
+    return _png(figure)
+
+
+def render_radar(league: typing.Dict[str, float], title: str = "Stats") -> bytes:
+    """
+    Radar chart of the `calc_stats.batch` metrics for a league dict with apm, pps and vs.
+    """
+    import math
+
+    from matplotlib.figure import Figure
+
+    # missing fields and stats undefined at 0 pps or apm come out as NaN, drawn as 0
+    raw = {
+        field: np.asarray(league.get(field), dtype=np.float64)
+        for field in ("apm", "pps", "vs")
+    }
+    stats = {**raw, **calc_stats.batch(**raw)}
+    values = []
+    for _, stat, rim in RADAR_AXES:
+        value = float(stats[stat]) / rim
+        values.append(0.0 if math.isnan(value) else max(0.0, min(value, 1.0)))
+    angles = [2 * math.pi * i / len(RADAR_AXES) for i in range(len(RADAR_AXES))]
+
+    figure = Figure(figsize=(5, 5))
+    axes = figure.add_subplot(projection="polar")
+    axes.plot(angles + angles[:1], values + values[:1])
+    axes.fill(angles + angles[:1], values + values[:1], alpha=0.3)
+    axes.set_xticks(angles)
+    axes.set_xticklabels([label for label, _, _ in RADAR_AXES])
+    axes.set_yticklabels([])
+    axes.set_ylim(0, 1)
+    axes.set_title(title, pad=20)
+    return _png(figure)
+
+
+KINDS: typing.Dict[str, typing.Callable[..., bytes]] = {
+    "progression": render_progression,
+    "radar": render_radar,
+}
+
+
+class ChartRenderer:
+    """
+    Owned by the bot (`bot.charts`), `start` it on startup and `close` it on shutdown.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: typing.Optional[int] = None,
+        max_bytes: typing.Optional[int] = None,
+        ttl: typing.Optional[float] = None,
+    ) -> None:
+        self.max_workers = (
+            int(os.getenv("CHART_WORKERS", "2")) if max_workers is None else max_workers
+        )
+        self.ttl = float(os.getenv("CHART_CACHE_TTL", "3600")) if ttl is None else ttl
+        self.cache: LRUCache[bytes] = LRUCache(
+            max_entries=1024,
+            max_bytes=int(os.getenv("CHART_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+            if max_bytes is None
+            else max_bytes,
+        )
+        self.inflight: SingleFlight[bytes] = SingleFlight()
+        self.executor: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    async def start(self) -> None:
+        # fork every worker now, while startup is still single threaded, instead of
+        # on the first render
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.max_workers,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_init_worker,
+        )
+        await asyncio.get_running_loop().run_in_executor(self.executor, int)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    async def render(
+        self,
+        kind: str,
+        player_id: str,
+        version: typing.Any,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> bytes:
+        """
+        Render chart `kind` (see `KINDS`) with `args`/`kwargs`, or reuse the PNG rendered for
+        the same player and data `version` (e.g. the latest history timestamp).
+        """
+        key = f"{kind}:{player_id}:{version}"
+        png = self.cache.get(key)
+        if png is not None:
+            return png
+        png = await self.inflight.do(key, lambda: self._render(kind, *args, **kwargs))
+        self.cache.set(key, png, ttl=self.ttl, weight=len(png))
+        return png
+
+    async def _render(
+        self, kind: str, *args: typing.Any, **kwargs: typing.Any
+    ) -> bytes:
+        if self.executor is None:
+            await self.start()
+        return await asyncio.wrap_future(
+            self.executor.submit(KINDS[kind], *args, **kwargs)
+        )
@@ -0,0 +1,66 @@
+"""
+Sync the app command tree with Discord only when it changed since the last sync.
+"""
+
+import asyncio
+import hashlib
+import logging
+import typing
+
+import orjson
+from discord import app_commands
+
+from . import sqls
+
+log = logging.getLogger("root.CommandSync")
+
+
+def tree_hash(tree: app_commands.CommandTree) -> str:
+    """
+    Hash of the global commands exactly as `tree.sync` would send them.
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    return hashlib.sha256(
+        orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+class CommandSync:
+    """
+    Owned by the bot (`bot.command_sync`). The last synced hash is kept in Postgres so
+    restarts and reconnects don't sync an unchanged tree again.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, db: sqls.EasySQL) -> None:
+        self.tree = tree
+        self.db = db
+        self.synced: typing.Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def sync(self, *, force: bool = False) -> bool:
+        """
+        Sync the global commands if they changed (or `force`), returns whether it synced.
+        """
+        async with self._lock:  # reconnects racing each other wait for the first sync
+            current = tree_hash(self.tree)
+            if self.synced is None:
+                self.synced = await self.db.fetchval(
+                    "SELECT hash FROM command_sync WHERE scope = 'global'"
+                )
+            if current == self.synced and not force:
+                log.info("Command tree unchanged, not syncing")
+                return False
+            synced = await self.tree.sync()
+            await self.db.execute(
+                """
+                INSERT INTO command_sync(scope, hash) VALUES('global', $1)
+                ON CONFLICT (scope) DO UPDATE SET hash = EXCLUDED.hash, synced_at = now()
+                """,
+                current,
+            )
+            self.synced = current
+            log.info(f"Synced {len(synced)} commands")
+            return True
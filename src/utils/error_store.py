@@ -0,0 +1,211 @@
+"""
+Unhandled command errors grouped by traceback fingerprint, with counts and a bounded
+on-disk store of the last reported full traceback per fingerprint.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import time
+import traceback
+import typing
+
+
+def fingerprint(error: BaseException) -> str:
+    """
+    Same error from the same code, even after unrelated edits moved its line numbers.
+    """
+    parts = [type(error).__qualname__]
+    for frame in traceback.extract_tb(error.__traceback__):
+        parts.append(f"{os.path.basename(frame.filename)}:{frame.name}:{frame.line}")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
+
+@dataclasses.dataclass
+class Entry:
+    fingerprint: str
+    type: str
+    message: str
+    command: typing.Optional[str]
+    first_seen: float
+    last_seen: float
+    count: int = 0
+    # monotonic time of the last full report, not persisted
+    reported: float = dataclasses.field(default=float("-inf"), repr=False)
+
+    def to_json(self) -> dict:
+        data = dataclasses.asdict(self)
+        del data["reported"]
+        return data
+
+
+class ErrorStore:
+    """
+    `record` errors as they happen, it tells whether a full report is due: the first time
+    and then at most once every `interval` seconds per fingerprint.
+    Repeats are only counted in memory, the index is saved with each report and otherwise
+    at most once every `interval` seconds, `flush` it on shutdown.
+    Formatting and every disk write run in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike, None] = None,
+        *,
+        max_entries: typing.Optional[int] = None,
+        interval: typing.Optional[float] = None,
+    ) -> None:
+        self.path = pathlib.Path(
+            os.getenv("ERROR_STORE", "logs/errors") if path is None else path
+        )
+        self.max_entries = (
+            int(os.getenv("ERROR_STORE_MAX_ENTRIES", "200"))
+            if max_entries is None
+            else max_entries
+        )
+        self.interval = (
+            float(os.getenv("ERROR_REPORT_INTERVAL", "300"))
+            if interval is None
+            else interval
+        )
+        self.entries: typing.Dict[str, Entry] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        # disk writes are serialized apart from `_lock`, recording never waits on them
+        self._disk = asyncio.Lock()
+        self._evicted: typing.Set[str] = set()
+        self._dirty = False
+        self._saved = float("-inf")
+        # snapshots are numbered, one taken earlier never overwrites a later one
+        self._snapshots = 0
+        self._written = 0
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+            self._loaded = True
+
+    def _load(self) -> None:
+        try:
+            index = json.loads((self.path / "index.json").read_text())
+        except (FileNotFoundError, ValueError):
+            index = []
+        self.entries = {data["fingerprint"]: Entry(**data) for data in index}
+
+    def _write(
+        self,
+        number: int,
+        index: typing.List[dict],
+        evicted: typing.List[str],
+        trace: typing.Optional[typing.Tuple[str, str]],
+    ) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        if trace is not None:
+            key, text = trace
+            (self.path / f"{key}.txt").write_text(text, encoding="utf-8")
+        for key in evicted:
+            (self.path / f"{key}.txt").unlink(missing_ok=True)
+        if number < self._written:
+            return
+        self._written = number
+        path = self.path / "index.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(index))
+        temporary.replace(path)
+
+    def _snapshot(self) -> typing.Tuple[int, typing.List[dict], typing.List[str]]:
+        # under `_lock`, what `_write` needs to save the current state
+        evicted = [key for key in self._evicted if key not in self.entries]
+        self._evicted.clear()
+        self._dirty = False
+        self._saved = time.monotonic()
+        self._snapshots += 1
+        return (
+            self._snapshots,
+            [entry.to_json() for entry in self.entries.values()],
+            evicted,
+        )
+
+    async def record(
+        self, error: BaseException, command: typing.Optional[str] = None
+    ) -> typing.Tuple[Entry, typing.Optional[str], bool]:
+        """
+        Count `error`, returns its entry, the formatted traceback when a report is due
+        (None otherwise) and whether to report it.
+        """
+        async with self._lock:
+            await self._ensure_loaded()
+            key = fingerprint(error)
+            now = time.time()
+            entry = self.entries.pop(key, None) or Entry(
+                key, type(error).__name__, str(error), command, now, now
+            )
+            entry.count += 1
+            entry.last_seen = now
+            entry.message = str(error)
+            self.entries[key] = entry  # most recently seen last
+            while len(self.entries) > self.max_entries:
+                evicted = next(iter(self.entries))
+                del self.entries[evicted]
+                self._evicted.add(evicted)
+            self._dirty = True
+
+            report = time.monotonic() - entry.reported >= self.interval
+            if report:
+                entry.reported = time.monotonic()
+            snapshot = None
+            if report or time.monotonic() - self._saved >= self.interval:
+                snapshot = self._snapshot()
+
+        trace = None
+        if report:
+            trace = await asyncio.to_thread(
+                lambda: "".join(
+                    traceback.format_exception(type(error), error, error.__traceback__)
+                )
+            )
+        if snapshot is not None:
+            async with self._disk:
+                await asyncio.to_thread(
+                    self._write, *snapshot, (key, trace) if report else None
+                )
+        return entry, trace, report
+
+    async def flush(self) -> None:
+        """
+        Save counts not written out yet.
+        """
+        async with self._lock:
+            if not self._dirty:
+                return
+            snapshot = self._snapshot()
+        async with self._disk:
+            await asyncio.to_thread(self._write, *snapshot, None)
+
+    async def recent(self, limit: typing.Optional[int] = None) -> typing.List[Entry]:
+        """
+        Entries, most recently seen first.
+        """
+        async with self._lock:
+            await self._ensure_loaded()
+            return list(reversed(self.entries.values()))[:limit]
+
+    async def trace(self, prefix: str) -> typing.Optional[typing.Tuple[Entry, str]]:
+        """
+        The entry and last reported traceback of the fingerprint starting with `prefix`.
+        """
+        matches = [
+            entry
+            for entry in await self.recent()
+            if entry.fingerprint.startswith(prefix)
+        ]
+        if len(matches) != 1:
+            return None
+        path = self.path / f"{matches[0].fingerprint}.txt"
+        try:
+            return matches[0], await asyncio.to_thread(path.read_text, "utf-8")
+        except FileNotFoundError:
+            return None
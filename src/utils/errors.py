@@ -2,3 +2,14 @@ class APIError(Exception):
     def __init__(self, error: str, *args: object) -> None:
         super().__init__(*args)
         self.error = error
+
+
+class UpstreamError(Exception):
+    """
+    TETR.IO couldn't be reached or kept failing, unlike `APIError` this says nothing
+    about the player asked for.
+    """
+
+    def __init__(self, error: str, *args: object) -> None:
+        super().__init__(*args)
+        self.error = error
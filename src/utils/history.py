@@ -0,0 +1,86 @@
+"""
+Append-only Tetra League history, one row every time a fresh profile differs from the last one.
+"""
+
+import datetime
+import typing
+
+import asyncpg
+
+from . import sqls
+
+# league fields that make up a history row, in table order after user_id and recorded_at
+FIELDS = (
+    "rating",
+    "glicko",
+    "rd",
+    "rank",
+    "apm",
+    "pps",
+    "vs",
+    "gamesplayed",
+    "gameswon",
+)
+
+_TYPES = {"rank": "text", "gamesplayed": "int", "gameswon": "int"}
+
+
+async def record(
+    db: sqls.EasySQL, payloads: typing.Iterable[typing.Tuple[datetime.datetime, dict]]
+) -> None:
+    """
+    Append a row for each `(fetched_at, /api/users/<name> response)` whose league fields
+    differ from that player's latest row.
+    """
+    rows = []
+    for fetched_at, payload in payloads:
+        user = payload["data"]["user"]
+        league = user.get("league") or {}
+        rows.append((user["_id"], fetched_at, *(league.get(field) for field in FIELDS)))
+    if not rows:
+        return
+
+    columns = ("user_id", "recorded_at", *FIELDS)
+    types = ("text", "timestamptz", *(_TYPES.get(field, "float8") for field in FIELDS))
+    arrays = ", ".join(f"${i}::{type_}[]" for i, type_ in enumerate(types, 1))
+    await db.execute(
+        f"""
+        INSERT INTO player_history({", ".join(columns)})
+        SELECT new.* FROM unnest({arrays}) AS new({", ".join(columns)})
+        WHERE NOT EXISTS (
+            SELECT 1 FROM (
+                SELECT * FROM player_history
+                WHERE user_id = new.user_id
+                ORDER BY recorded_at DESC
+                LIMIT 1
+            ) last
+            WHERE ({", ".join(f"last.{field}" for field in FIELDS)})
+            IS NOT DISTINCT FROM ({", ".join(f"new.{field}" for field in FIELDS)})
+        )
+        """,
+        *zip(*rows),
+    )
+
+
+async def fetch(
+    db: sqls.EasySQL,
+    user_id: str,
+    *,
+    since: typing.Optional[datetime.datetime] = None,
+    until: typing.Optional[datetime.datetime] = None,
+) -> typing.List[asyncpg.Record]:
+    """
+    A player's history in time order, optionally limited to `since <= recorded_at < until`.
+    """
+    return await db.fetchall(
+        """
+        SELECT * FROM player_history
+        WHERE user_id = $1
+        AND ($2::timestamptz IS NULL OR recorded_at >= $2)
+        AND ($3::timestamptz IS NULL OR recorded_at < $3)
+        ORDER BY recorded_at
+        """,
+        user_id,
+        since,
+        until,
+    )
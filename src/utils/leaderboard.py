@@ -0,0 +1,147 @@
+"""
+Streaming ingestion of the Tetra League leaderboard into a Postgres snapshot table.
+Only one page is held in memory at a time, no matter how big the leaderboard is.
+"""
+
+import time
+import typing
+
+import yarl
+
+from . import sqls
+from .api import BASE_URL, Request
+from .errors import APIError
+from .ratelimit import Priority
+
+LEADERBOARD_URL = BASE_URL / "lists" / "league"
+
+
+class IngestRunning(Exception):
+    """
+    Another `ingest` into the same table hasn't finished yet.
+    """
+
+
+COLUMNS = (
+    "position",
+    "user_id",
+    "username",
+    "country",
+    "rank",
+    "rating",
+    "glicko",
+    "rd",
+    "apm",
+    "pps",
+    "vs",
+    "gamesplayed",
+    "gameswon",
+    "decaying",
+)
+
+# (name, definition) built on the new snapshot after loading it, which is faster than
+# maintaining them row by row during COPY
+INDEXES = (
+    ("rating_idx", "(rating DESC)"),
+    ("username_idx", "(username)"),
+    ("user_id_idx", "(user_id)"),
+    ("rank_idx", "(rank)"),
+)
+
+
+async def pages(
+    *, url: yarl.URL = LEADERBOARD_URL, limit: int = 100
+) -> typing.AsyncIterator[typing.List[dict]]:
+    """
+    Yield leaderboard pages from the top down, paging with the rating of the last player.
+    """
+    after = None
+    while True:
+        query = {"limit": limit} if after is None else {"limit": limit, "after": after}
+        result = await Request.get(url.with_query(query), priority=Priority.BACKGROUND)
+        if not result["success"]:
+            raise APIError(result["error"])
+        users = result["data"]["users"]
+        if users:
+            yield users
+        if len(users) < limit:
+            return
+        after = users[-1]["league"]["rating"]
+
+
+async def records(
+    *, url: yarl.URL = LEADERBOARD_URL, limit: int = 100
+) -> typing.AsyncIterator[tuple]:
+    """
+    Yield one row per player in `COLUMNS` order.
+    """
+    position = 0
+    async for page in pages(url=url, limit=limit):
+        for user in page:
+            position += 1
+            league = user.get("league") or {}
+            yield (
+                position,
+                user["_id"],
+                user["username"],
+                user.get("country"),
+                league.get("rank"),
+                league.get("rating"),
+                league.get("glicko"),
+                league.get("rd"),
+                league.get("apm"),
+                league.get("pps"),
+                league.get("vs"),
+                league.get("gamesplayed"),
+                league.get("gameswon"),
+                league.get("decaying"),
+            )
+
+
+async def ingest(
+    db: sqls.EasySQL,
+    *,
+    url: yarl.URL = LEADERBOARD_URL,
+    limit: int = 100,
+    table: str = "league_snapshot",
+) -> typing.Tuple[int, float]:
+    """
+    Load the whole leaderboard into `<table>_next` with COPY, then swap it in as `table`
+    in one transaction so readers only ever see a complete snapshot.
+    Returns the number of players loaded and how long it took in seconds.
+    Raises `IngestRunning` when another run, from this process or not, holds the table.
+    """
+    started = time.perf_counter()
+    staging = f"{table}_next"
+    async with db.acquire() as conn:
+        # session lock, so a second run can't drop the staging table mid COPY
+        if not await conn.fetchval(
+            "SELECT pg_try_advisory_lock(hashtext($1))", f"ingest:{table}"
+        ):
+            raise IngestRunning(table)
+        try:
+            await conn.execute(
+                f"""
+                DROP TABLE IF EXISTS {staging};
+                CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS);
+                """
+            )
+            status = await conn.copy_records_to_table(
+                staging, records=records(url=url, limit=limit), columns=COLUMNS
+            )
+            for name, definition in INDEXES:
+                await conn.execute(
+                    f"CREATE INDEX {staging}_{name} ON {staging} {definition}"
+                )
+            async with conn.transaction():
+                await conn.execute(f"DROP TABLE {table}")
+                await conn.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+                for name, _ in INDEXES:
+                    await conn.execute(
+                        f"ALTER INDEX {staging}_{name} RENAME TO {table}_{name}"
+                    )
+        finally:
+            await conn.execute(
+                "SELECT pg_advisory_unlock(hashtext($1))", f"ingest:{table}"
+            )
+    return int(status.split()[-1]), time.perf_counter() - started
@@ -0,0 +1,138 @@
+"""
+Logging setup: records are queued by the logging call and written to the console and a
+rotating file by a background thread, so disk I/O never runs on the event loop.
+
+Configured from the environment:
+    LOG_LEVEL        root level (INFO)
+    LOG_LEVELS       per-logger levels, e.g. "discord=WARNING,root.Reloader=DEBUG"
+    LOG_FILE         log file (logs/bot.log), rotated at LOG_MAX_BYTES keeping LOG_BACKUPS
+    LOG_JSON         "1" to write the file as JSON lines
+"""
+
+import datetime
+import logging
+import logging.handlers
+import os
+import pathlib
+import queue
+import typing
+
+import orjson
+
+FORMAT = "[%(asctime)s] - [%(levelname)s] [%(name)s] %(message)s"
+DATE_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+# chatty libraries, LOG_LEVELS overrides these
+DEFAULT_LEVELS = {"discord": "WARNING", "asyncio": "WARNING", "werkzeug": "WARNING"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line, plus whatever was passed with `extra=`.
+    """
+
+    # attributes every LogRecord has, anything else came from `extra`
+    _standard = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in self._standard:
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # like the default, resolve what may not survive until the listener gets to it,
+        # but keep the traceback apart from the message for the JSON output
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Listener(logging.handlers.QueueListener):
+    def stop(self) -> None:
+        # startup can fail before the listener was started, still write out the queue
+        if self._thread is None:
+            self.start()
+        super().stop()
+
+
+def parse_levels(value: str) -> typing.Dict[str, str]:
+    """
+    "discord=WARNING, root.Reloader=debug" -> {"discord": "WARNING", "root.Reloader": "DEBUG"}
+    """
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup(
+    *,
+    level: typing.Optional[str] = None,
+    levels: typing.Optional[typing.Dict[str, str]] = None,
+    file: typing.Optional[str] = None,
+    max_bytes: typing.Optional[int] = None,
+    backups: typing.Optional[int] = None,
+    json: typing.Optional[bool] = None,
+) -> logging.handlers.QueueListener:
+    """
+    Route every log record through a queue and return the listener writing them out.
+    Records queue up until it's `start`ed, `stop` it on exit to flush what's left, which
+    is safe whether or not it was started.
+    """
+    level = os.getenv("LOG_LEVEL", "INFO") if level is None else level
+    levels = (
+        {**DEFAULT_LEVELS, **parse_levels(os.getenv("LOG_LEVELS", ""))}
+        if levels is None
+        else levels
+    )
+    file = os.getenv("LOG_FILE", "logs/bot.log") if file is None else file
+    max_bytes = (
+        int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        if max_bytes is None
+        else max_bytes
+    )
+    backups = int(os.getenv("LOG_BACKUPS", "5")) if backups is None else backups
+    json = os.getenv("LOG_JSON", "") in ("1", "true") if json is None else json
+
+    text = logging.Formatter(FORMAT, DATE_FORMAT)
+    console = logging.StreamHandler()
+    console.setFormatter(text)
+    pathlib.Path(file).parent.mkdir(parents=True, exist_ok=True)
+    rotating = logging.handlers.RotatingFileHandler(
+        file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+    )
+    rotating.setFormatter(JSONFormatter() if json else text)
+    if rotating.stream.tell():  # every run starts a fresh file, the last one is kept
+        rotating.doRollover()
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(records))
+    root.setLevel(level.upper())
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    return _Listener(records, console, rotating, respect_handler_level=True)
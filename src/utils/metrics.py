@@ -0,0 +1,341 @@
+"""
+In-process metrics: counters and latency histograms recorded on the event loop, plus
+values read from elsewhere (cache stats, the connection pool) when they're collected.
+`REGISTRY.render` produces the Prometheus text format and `Server` exposes it over HTTP.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+import typing
+
+Labels = typing.Tuple[str, ...]
+
+# seconds, covers a cache hit through a slow upstream request with retries
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: typing.Sequence[str], values: typing.Sequence[str]) -> str:
+    if not names:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+        + "}"
+    )
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: typing.Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: typing.Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        with self._lock:
+            values = list(self.values.items())
+        for labels, value in sorted(values):
+            yield self.name, _labels(self.labels, labels), value
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: typing.Dict[Labels, _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = _Series(len(self.buckets) + 1)
+            series.buckets[bisect.bisect_left(self.buckets, value)] += 1
+            series.count += 1
+            series.sum += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """
+        `with histogram.time("label"):` observes how long the block took.
+        """
+        return _Timer(self, labels)
+
+    def quantile(self, q: float, *labels: str) -> float:
+        """
+        Estimate the `q` quantile from the buckets, the way Prometheus'
+        `histogram_quantile` does. NaN without observations.
+        """
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None or not series.count:
+                return math.nan
+            counts = list(series.buckets)
+            rank = q * series.count
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):  # past the last bound, all we know
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        with self._lock:
+            series = [
+                (labels, list(s.buckets), s.count, s.sum)
+                for labels, s in self.series.items()
+            ]
+        for labels, buckets, count, sum_ in sorted(series):
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, math.inf), buckets):
+                cumulative += bucket
+                yield f"{self.name}_bucket", _labels(
+                    (*self.labels, "le"), (*labels, _number(float(bound)))
+                ), cumulative
+            yield f"{self.name}_count", _labels(self.labels, labels), count
+            yield f"{self.name}_sum", _labels(self.labels, labels), sum_
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Labels) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: typing.Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Callback:
+    """
+    Values owned by something else, read when metrics are collected.
+    `callback` returns `{label values: value}`, or a single value without labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labels: typing.Sequence[str],
+        callback: typing.Callable[[], typing.Union[float, typing.Dict[Labels, float]]],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self) -> typing.Iterator[typing.Tuple[str, str, float]]:
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield self.name, _labels(self.labels, labels), value
+
+
+Metric = typing.Union[Counter, Histogram, Callback]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: typing.Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> typing.Any:
+        # modules reloaded by the file watcher register again, keep the recorded values
+        existing = self.metrics.get(metric.name)
+        if type(existing) is type(metric) and not isinstance(metric, Callback):
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, help: str, labels: typing.Sequence[str] = ()
+    ) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        callback: typing.Callable[[], typing.Union[float, typing.Dict[Labels, float]]],
+        *,
+        kind: str = "gauge",
+        labels: typing.Sequence[str] = (),
+    ) -> Callback:
+        return self._add(Callback(name, help, kind, labels, callback))
+
+    def render(self) -> str:
+        """
+        Everything in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+callback = REGISTRY.callback
+
+COMMAND_LATENCY = histogram(
+    "osk_command_duration_seconds", "Time spent running a command.", ("command",)
+)
+COMMAND_ERRORS = counter(
+    "osk_command_errors_total",
+    "Commands that raised, by error type.",
+    ("command", "error"),
+)
+UPSTREAM_LATENCY = histogram(
+    "osk_tetrio_request_duration_seconds",
+    "TETR.IO request latency by HTTP status, 'error' when no response arrived.",
+    ("status",),
+)
+
+
+def instrument(bot: typing.Any) -> None:
+    """
+    Record command latency and errors of `bot`, and its connection pool usage.
+    """
+
+    async def on_command(ctx: typing.Any) -> None:
+        ctx.metrics_started = time.perf_counter()
+
+    def finished(ctx: typing.Any) -> None:
+        started = getattr(ctx, "metrics_started", None)
+        if started is not None and ctx.command is not None:
+            COMMAND_LATENCY.observe(
+                time.perf_counter() - started, ctx.command.qualified_name
+            )
+
+    async def on_command_completion(ctx: typing.Any) -> None:
+        finished(ctx)
+
+    async def on_command_error(ctx: typing.Any, error: Exception) -> None:
+        # the prefix is empty, every chat message that isn't a command ends up here
+        if ctx.command is None:
+            return
+        finished(ctx)
+        COMMAND_ERRORS.inc(
+            ctx.command.qualified_name,
+            type(getattr(error, "original", error)).__name__,
+        )
+
+    bot.add_listener(on_command)
+    bot.add_listener(on_command_completion)
+    bot.add_listener(on_command_error)
+
+    def pool(stat: str) -> typing.Callable[[], float]:
+        def read() -> float:
+            db = getattr(bot, "db", None)
+            if db is None or db.db is None:
+                return 0
+            return getattr(db.db, stat)()
+
+        return read
+
+    callback("osk_db_pool_size", "Open database connections.", pool("get_size"))
+    callback("osk_db_pool_idle", "Idle database connections.", pool("get_idle_size"))
+    callback("osk_db_pool_max", "Database connection limit.", pool("get_max_size"))
+
+
+class Server:
+    """
+    Serves `REGISTRY` at `/metrics` from a background thread.
+    """
+
+    def __init__(
+        self,
+        registry: Registry = REGISTRY,
+        *,
+        host: typing.Optional[str] = None,
+        port: typing.Optional[int] = None,
+    ) -> None:
+        self.registry = registry
+        self.host = os.getenv("METRICS_HOST", "127.0.0.1") if host is None else host
+        self.port = int(os.getenv("METRICS_PORT", "9108")) if port is None else port
+        self._server: typing.Any = None
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        from flask import Flask, Response
+        from werkzeug.serving import make_server
+
+        app = Flask("osk-metrics")
+
+        @app.route("/metrics")
+        def metrics() -> Response:
+            return Response(
+                self.registry.render(), mimetype="text/plain; version=0.0.4"
+            )
+
+        self._server = make_server(self.host, self.port, app, threaded=True)
+        self.port = self._server.server_port  # when started on port 0
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._server = None
@@ -0,0 +1,113 @@
+"""
+Outbound request scheduling for TETR.IO: a token bucket drained in priority order.
+"""
+
+import asyncio
+import dataclasses
+import enum
+import heapq
+import itertools
+import time
+import typing
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+@dataclasses.dataclass
+class WaitStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Scheduler:
+    """
+    Token bucket refilled at `rate` tokens a second up to `burst`.
+    Callers that can't get a token right away queue up and are served interactive first,
+    then first come first served. `pause` stops everything, e.g. for an upstream Retry-After.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.waits = {priority: WaitStats() for priority in Priority}
+        self._queue: typing.List[
+            typing.Tuple[Priority, int, float, "asyncio.Future[None]"]
+        ] = []
+        self._counter = itertools.count()
+        self._drainer: typing.Optional["asyncio.Task[None]"] = None
+
+    def depth(self, priority: typing.Optional[Priority] = None) -> int:
+        return sum(
+            1
+            for queued, _, _, future in self._queue
+            if not future.done() and (priority is None or queued == priority)
+        )
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _record(self, priority: Priority, waited: float) -> None:
+        stats = self.waits[priority]
+        stats.count += 1
+        stats.total += waited
+        stats.max = max(stats.max, waited)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        self._refill()
+        if not self._queue and self.paused_until <= self.clock() and self.tokens >= 1:
+            self.tokens -= 1
+            self._record(priority, 0.0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue, (priority, next(self._counter), self.clock(), future)
+        )
+        if (
+            self._drainer is None
+            or self._drainer.done()
+            or self._drainer.get_loop() is not future.get_loop()
+        ):
+            self._drainer = asyncio.ensure_future(self._drain())
+        await future
+
+    def pause(self, seconds: float) -> None:
+        self.throttled += 1
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    async def _drain(self) -> None:
+        while self._queue:
+            delay = self.paused_until - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            priority, _, enqueued, future = heapq.heappop(self._queue)
+            if future.done():  # the waiter was cancelled
+                continue
+            self.tokens -= 1
+            self._record(priority, self.clock() - enqueued)
+            future.set_result(None)
@@ -0,0 +1,174 @@
+"""
+Background refresh of the players people keep asking about, so cache expiry rarely
+costs a user the full TETR.IO round trip.
+"""
+
+import asyncio
+import collections
+import dataclasses
+import datetime
+import logging
+import os
+import time
+import typing
+
+from . import sqls
+from .api import PlayerAPI
+from .errors import APIError, UpstreamError
+
+log = logging.getLogger("root.Refresher")
+
+
+@dataclasses.dataclass
+class _Tracked:
+    requests: int
+    last_seen: float
+
+
+class Refresher:
+    """
+    Tracks recently and frequently requested players and refreshes them shortly before
+    their cache expires, at most `budget` upstream requests a minute.
+    While it runs, `PlayerAPI.get_player` serves expired entries within the stale grace
+    period right away and hands them to `revalidate`.
+    """
+
+    def __init__(
+        self,
+        db: sqls.EasySQL,
+        *,
+        budget: typing.Optional[int] = None,
+        lead: typing.Optional[float] = None,
+        interval: typing.Optional[float] = None,
+        max_tracked: typing.Optional[int] = None,
+        idle: typing.Optional[float] = None,
+    ) -> None:
+        self.db = db
+        self.budget = (
+            int(os.getenv("REFRESH_BUDGET", "30")) if budget is None else budget
+        )
+        self.lead = float(os.getenv("REFRESH_LEAD", "30")) if lead is None else lead
+        self.interval = (
+            float(os.getenv("REFRESH_INTERVAL", "10")) if interval is None else interval
+        )
+        self.max_tracked = (
+            int(os.getenv("REFRESH_MAX_TRACKED", "500"))
+            if max_tracked is None
+            else max_tracked
+        )
+        self.idle = float(os.getenv("REFRESH_IDLE", "1800")) if idle is None else idle
+        # (username, when) of the latest refreshes, newest last
+        self.refreshed: typing.Deque[
+            typing.Tuple[str, datetime.datetime]
+        ] = collections.deque(maxlen=50)
+        self.failed = 0
+        self.skipped = 0
+        self._tracked: "collections.OrderedDict[str, _Tracked]" = (
+            collections.OrderedDict()
+        )
+        self._refreshing: typing.Dict[str, "asyncio.Task[None]"] = {}
+        self._window = 0.0
+        self._spent = 0
+        self._task: typing.Optional["asyncio.Task[None]"] = None
+
+    @property
+    def tracked(self) -> typing.List[str]:
+        return list(self._tracked)
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+        PlayerAPI.refresher = self
+
+    async def close(self) -> None:
+        if PlayerAPI.refresher is self:
+            PlayerAPI.refresher = None
+        tasks = [*self._refreshing.values(), *([self._task] if self._task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def track(self, username: str) -> None:
+        tracked = self._tracked.get(username)
+        if tracked is None:
+            tracked = self._tracked[username] = _Tracked(0, 0.0)
+        tracked.requests += 1
+        tracked.last_seen = time.monotonic()
+        self._tracked.move_to_end(username)
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+
+    def revalidate(self, username: str) -> bool:
+        """
+        Refresh `username` in the background if the budget allows.
+        """
+        if username in self._refreshing:
+            return True
+        if not self._spend():
+            self.skipped += 1
+            return False
+        task = asyncio.ensure_future(self._refresh(username))
+        self._refreshing[username] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(username, None))
+        return True
+
+    def _spend(self) -> bool:
+        now = time.monotonic()
+        if now - self._window >= 60:
+            self._window, self._spent = now, 0
+        if self._spent >= self.budget:
+            return False
+        self._spent += 1
+        return True
+
+    async def _refresh(self, username: str) -> None:
+        try:
+            await PlayerAPI.refresh(username, self.db)
+        except APIError:
+            self._tracked.pop(username, None)  # gone upstream, stop asking
+            self.failed += 1
+        except UpstreamError as error:
+            log.warning(f"Failed to refresh {username}: {error.error}")
+            self.failed += 1  # TETR.IO is down or throttling, try again next pass
+        except Exception:
+            log.exception(f"Failed to refresh {username}")
+            self.failed += 1
+        else:
+            self.refreshed.append(
+                (username, datetime.datetime.now(datetime.timezone.utc))
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._tick()
+            except Exception:
+                log.exception("Refresh pass failed")
+
+    async def _tick(self) -> None:
+        now = time.monotonic()
+        for username in [
+            username
+            for username, tracked in self._tracked.items()
+            if now - tracked.last_seen > self.idle
+        ]:
+            del self._tracked[username]
+        if not self._tracked:
+            return
+        rows = await self.db.fetchall(
+            """
+            SELECT username FROM cache
+            WHERE username = ANY($1::text[]) AND (data->>'success')::boolean
+            AND expires_at < now() + make_interval(secs => $2)
+            """,
+            list(self._tracked),
+            self.lead,
+        )
+        # most requested first, the budget may not cover everyone
+        for username in sorted(
+            (row["username"] for row in rows),
+            key=lambda username: getattr(self._tracked.get(username), "requests", 0),
+            reverse=True,
+        ):
+            if not self.revalidate(username):
+                break
@@ -0,0 +1,230 @@
+"""
+Hot reload for development: file changes under `src` are batched on the bot's loop and
+the changed modules are reloaded together with every loaded module and extension that
+imports them, dependencies first.
+Modules in `STATEFUL` hold state the running bot depends on and are never reloaded, nor
+is anything they import (their classes must stay the ones the live objects use),
+changing them takes a restart.
+"""
+
+import ast
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import time
+import typing
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+log = logging.getLogger("root.Reloader")
+
+# the HTTP session, rate limiter, player caches, metrics registry, build info and what
+# they're built from, reloading any of them would orphan state that's still in use
+STATEFUL = frozenset(
+    {
+        "src.utils.api",
+        "src.utils.build",
+        "src.utils.cache",
+        "src.utils.history",
+        "src.utils.metrics",
+        "src.utils.ratelimit",
+        "src.utils.sqls",
+    }
+)
+
+
+def module_name(path: str, root: str = ".") -> typing.Optional[str]:
+    """
+    `src/utils/api.py` -> `src.utils.api`, None for anything that isn't Python.
+    """
+    if not path.endswith(".py"):
+        return None
+    name = os.path.relpath(path, root)[:-3].replace(os.sep, ".").replace("/", ".")
+    return name[: -len(".__init__")] if name.endswith(".__init__") else name
+
+
+def _runtime_nodes(node: ast.AST) -> typing.Iterator[ast.AST]:
+    # like `ast.walk`, minus `if TYPE_CHECKING:` blocks which aren't imported at runtime
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.If) and ast.unparse(child.test) in (
+            "TYPE_CHECKING",
+            "typing.TYPE_CHECKING",
+        ):
+            children: typing.List[ast.AST] = child.orelse
+        else:
+            children = [child]
+        for child in children:
+            yield child
+            yield from _runtime_nodes(child)
+
+
+def imports(module: typing.Any) -> typing.Set[str]:
+    """
+    Names of the already loaded modules `module` imports at runtime, read from its source.
+    """
+    try:
+        with open(module.__file__, "rb") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, TypeError):
+        return set()
+    package = module.__package__ or ""
+    found = set()
+    for node in _runtime_nodes(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package.rsplit(".", node.level - 1)[0] if package else ""
+                base = f"{parent}.{base}" if base else parent
+            found.add(base)
+            # `from . import api` imports a module, `from .api import X` doesn't
+            found.update(f"{base}.{alias.name}" for alias in node.names)
+    return {name for name in found if name in sys.modules}
+
+
+def dependency_order(
+    changed: typing.Iterable[str], prefix: str = "src."
+) -> typing.List[str]:
+    """
+    `changed` plus every loaded module under `prefix` importing them, directly or not,
+    ordered so a module comes after everything it imports.
+    """
+    loaded = {
+        name: imports(module)
+        for name, module in list(sys.modules.items())
+        if name.startswith(prefix) and getattr(module, "__file__", None)
+    }
+    affected = {name for name in changed if name in loaded}
+    grew = True
+    while grew:
+        dependents = {
+            name
+            for name, deps in loaded.items()
+            if name not in affected and deps & affected
+        }
+        affected |= dependents
+        grew = bool(dependents)
+
+    ordered: typing.List[str] = []
+    visiting: typing.Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in ordered or name in visiting:  # import cycles keep source order
+            return
+        visiting.add(name)
+        for dependency in sorted(loaded[name] & affected):
+            visit(dependency)
+        ordered.append(name)
+
+    for name in sorted(affected):
+        visit(name)
+    return ordered
+
+
+def requirements(names: typing.Iterable[str], prefix: str = "src.") -> typing.Set[str]:
+    """
+    `names` plus every loaded module under `prefix` they import, directly or not.
+    """
+    found: typing.Set[str] = set()
+    pending = [name for name in names if name in sys.modules]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.add(name)
+        pending.extend(
+            dependency
+            for dependency in imports(sys.modules[name])
+            if dependency.startswith(prefix)
+        )
+    return found
+
+
+class Reloader(FileSystemEventHandler):
+    """
+    Watchdog handler for the `package` directory, schedule it on the observer once the
+    bot's loop is running.
+    Changes within `delay` seconds of each other are reloaded as one batch.
+    """
+
+    def __init__(
+        self,
+        bot: typing.Any,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        package: str = "src",
+        delay: typing.Optional[float] = None,
+        stateful: typing.Iterable[str] = STATEFUL,
+    ) -> None:
+        self.bot = bot
+        self.loop = loop
+        self.package = package
+        self.stateful = frozenset(stateful)
+        self.delay = (
+            float(os.getenv("RELOAD_DEBOUNCE", "0.5")) if delay is None else delay
+        )
+        self.pending: typing.Set[str] = set()
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+
+    def on_modified(self, event: FileSystemEvent) -> None:
+        self._changed(event.src_path)
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        self._changed(event.src_path)
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        self._changed(event.dest_path)
+
+    def _changed(self, path: str) -> None:
+        # watchdog thread, everything else happens on the bot's loop
+        name = module_name(path)
+        if name is not None and name != __name__:
+            asyncio.run_coroutine_threadsafe(self._schedule(name), self.loop)
+
+    async def _schedule(self, name: str) -> None:
+        self.pending.add(name)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_later(
+            self.delay, lambda: asyncio.ensure_future(self.reload())
+        )
+
+    async def reload(self) -> typing.List[str]:
+        """
+        Reload the pending modules and their dependents, returns what was reloaded.
+        """
+        async with self._lock:  # a batch arriving mid reload waits for this one
+            changed, self.pending = self.pending, set()
+            if not changed:
+                return []
+            started = time.perf_counter()
+            reloaded: typing.List[str] = []
+            failed: typing.Set[str] = set()
+            prefix = f"{self.package}."
+            stateful = requirements(self.stateful, prefix)
+            skipped = sorted(changed & stateful)
+            for name in dependency_order(changed - stateful, prefix=prefix):
+                if imports(sys.modules[name]) & failed:
+                    failed.add(name)  # would pick up the stale dependency
+                    continue
+                try:
+                    if name in self.bot.extensions:
+                        await self.bot.reload_extension(name)
+                    else:
+                        importlib.reload(sys.modules[name])
+                except Exception:
+                    log.exception(f"Failed to reload {name}")
+                    failed.add(name)
+                else:
+                    reloaded.append(name)
+            took = (time.perf_counter() - started) * 1000
+            log.info(f"Reloaded {', '.join(reloaded) or 'nothing'} in {took:.0f}ms")
+            if failed:
+                log.warning(f"Not reloaded: {', '.join(sorted(failed))}")
+            if skipped:
+                log.warning(f"Restart required to pick up {', '.join(skipped)}")
+            return reloaded
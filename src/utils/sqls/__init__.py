@@ -1,6 +1,7 @@
 import typing
 
 import asyncpg
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,16 +9,61 @@ import os
 
 
 class EasySQL:
+    """
+    Thin wrapper around one process-wide asyncpg pool.
+    The bot owns a single instance (`bot.db`), connect it once on startup and close it on shutdown.
+    """
+
     def __init__(self) -> None:
-        self.db = None
-        self.cursor = None
+        self.db: typing.Optional[asyncpg.Pool] = None
 
-    async def connect(self) -> typing.Optional[asyncpg.connection.Connection]:
+    async def connect(
+        self,
+        *,
+        min_size: typing.Optional[int] = None,
+        max_size: typing.Optional[int] = None,
+        max_inactive_connection_lifetime: typing.Optional[float] = None,
+        statement_cache_size: typing.Optional[int] = None,
+    ) -> typing.Optional[asyncpg.Pool]:
+        if self.db is not None:
+            return self.db
+        min_size = int(os.getenv("DB_POOL_MIN", "1")) if min_size is None else min_size
+        max_size = int(os.getenv("DB_POOL_MAX", "10")) if max_size is None else max_size
+        max_inactive_connection_lifetime = (
+            float(os.getenv("DB_POOL_MAX_INACTIVE", "300"))
+            if max_inactive_connection_lifetime is None
+            else max_inactive_connection_lifetime
+        )
+        statement_cache_size = (
+            int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+            if statement_cache_size is None
+            else statement_cache_size
+        )
         self.db = await asyncpg.create_pool(
-            f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+            f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}",
+            min_size=min_size,
+            max_size=max_size,
+            max_inactive_connection_lifetime=max_inactive_connection_lifetime,
+            statement_cache_size=statement_cache_size,
+            init=self._init_connection,
         )
         return self.db
 
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection) -> None:
+        # binary JSONB is a version byte followed by the JSON text, so orjson reads
+        # straight from the wire buffer with no utf-8 decode/encode in between
+        await conn.set_type_codec(
+            "jsonb",
+            schema="pg_catalog",
+            encoder=_encode_jsonb,
+            decoder=_decode_jsonb,
+            format="binary",
+        )
+
+    def acquire(self) -> asyncpg.pool.PoolAcquireContext:
+        return self.db.acquire()
+
     async def execute(self, query, *args) -> typing.Optional[dict]:
         async with self.db.acquire() as conn:
             await conn.execute(query, *args)
@@ -27,18 +73,37 @@ class EasySQL:
             a = await conn.fetch(query, *args)
             return dict(a)
 
-    async def close(self) -> None:
-        await self.cursor.close()
-        await self.db.close()
+    async def fetchall(self, query, *args) -> typing.List[asyncpg.Record]:
+        async with self.db.acquire() as conn:
+            return await conn.fetch(query, *args)
 
-    async def commit(self) -> None:
-        await self.db.commit()
+    async def fetchrow(self, query, *args) -> typing.Optional[asyncpg.Record]:
+        async with self.db.acquire() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def fetchval(self, query, *args) -> typing.Any:
+        async with self.db.acquire() as conn:
+            return await conn.fetchval(query, *args)
 
-    async def rollback(self) -> None:
-        await self.db.rollback()
+    async def close(self) -> None:
+        if self.db is not None:
+            await self.db.close()
+        self.db = None
 
     async def __aenter__(self) -> "EasySQL":
+        await self.connect()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         await self.close()
+
+
+def _encode_jsonb(value: typing.Any) -> bytes:
+    # bytes are taken as already serialized JSON
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return b"\x01" + bytes(value)
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> typing.Any:
+    return orjson.loads(memoryview(data)[1:])
@@ -1,4 +1,70 @@
-CREATE TABLE cache(
+CREATE TABLE IF NOT EXISTS cache(
     username TEXT NOT NULL PRIMARY KEY,
-    data JSON NOT NULL
-);
\ No newline at end of file
+    data JSONB NOT NULL
+);
+
+ALTER TABLE cache ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE cache ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS cache_expires_at_idx ON cache(expires_at);
+
+-- caches created before JSONB stored the payload as JSON
+DO $$
+BEGIN
+    IF (
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'cache' AND column_name = 'data'
+    ) = 'json' THEN
+        ALTER TABLE cache ALTER COLUMN data TYPE JSONB USING data::jsonb;
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS cache_league_rating_idx
+    ON cache(((data #>> '{data,user,league,rating}')::float8));
+
+-- swapped for a fresh copy by src/utils/leaderboard.py on every ingestion
+CREATE TABLE IF NOT EXISTS league_snapshot(
+    position INT NOT NULL,
+    user_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    country TEXT,
+    rank TEXT,
+    rating FLOAT8,
+    glicko FLOAT8,
+    rd FLOAT8,
+    apm FLOAT8,
+    pps FLOAT8,
+    vs FLOAT8,
+    gamesplayed INT,
+    gameswon INT,
+    decaying BOOLEAN,
+    ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS league_snapshot_rating_idx ON league_snapshot(rating DESC);
+CREATE INDEX IF NOT EXISTS league_snapshot_username_idx ON league_snapshot(username);
+CREATE INDEX IF NOT EXISTS league_snapshot_user_id_idx ON league_snapshot(user_id);
+CREATE INDEX IF NOT EXISTS league_snapshot_rank_idx ON league_snapshot(rank);
+
+-- append-only, rows arrive in time order so a BRIN index keeps range scans over months cheap
+CREATE TABLE IF NOT EXISTS player_history(
+    user_id TEXT NOT NULL,
+    recorded_at TIMESTAMPTZ NOT NULL,
+    rating FLOAT8,
+    glicko FLOAT8,
+    rd FLOAT8,
+    rank TEXT,
+    apm FLOAT8,
+    pps FLOAT8,
+    vs FLOAT8,
+    gamesplayed INT,
+    gameswon INT
+);
+CREATE INDEX IF NOT EXISTS player_history_user_id_idx ON player_history(user_id, recorded_at DESC);
+CREATE INDEX IF NOT EXISTS player_history_recorded_at_idx ON player_history USING BRIN(recorded_at);
+
+-- hash of the app command tree last synced to Discord, per scope ('global' or a guild id)
+CREATE TABLE IF NOT EXISTS command_sync(
+    scope TEXT NOT NULL PRIMARY KEY,
+    hash TEXT NOT NULL,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
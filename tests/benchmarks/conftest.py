@@ -0,0 +1,105 @@
+"""
+`bench(name, func)` times `func` (sync or async) and compares the best time per call
+against `baselines.json`, failing when it's more than `--benchmark-threshold` slower.
+Baselines are machine specific, refresh them with `--benchmark-save` after a deliberate change.
+"""
+
+import asyncio
+import json
+import pathlib
+import time
+import timeit
+import typing
+
+import pytest
+
+BASELINES = pathlib.Path(__file__).parent / "baselines.json"
+REPEAT = 9
+
+results: typing.Dict[str, float] = {}
+
+
+def _load() -> typing.Dict[str, float]:
+    try:
+        return json.loads(BASELINES.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def _time_async(
+    loop: asyncio.AbstractEventLoop,
+    func: typing.Callable[[], typing.Awaitable[typing.Any]],
+) -> float:
+    async def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - started
+
+    async def measure() -> float:
+        number = 1
+        while (elapsed := await run(number)) < 0.2:  # like timeit's autorange
+            number *= 10
+        best = elapsed
+        for _ in range(REPEAT - 1):
+            best = min(best, await run(number))
+        return best / number
+
+    return loop.run_until_complete(measure())
+
+
+def _time(func: typing.Callable[[], typing.Any]) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, number)) / number
+
+
+@pytest.fixture
+def bench(
+    request: pytest.FixtureRequest, loop: asyncio.AbstractEventLoop
+) -> typing.Callable[..., float]:
+    threshold = request.config.getoption("--benchmark-threshold")
+    baselines = _load()
+
+    def bench(name: str, func: typing.Callable[[], typing.Any]) -> float:
+        took = (
+            _time_async(loop, func)
+            if asyncio.iscoroutinefunction(func)
+            else _time(func)
+        )
+        results[name] = took
+        baseline = baselines.get(name)
+        if baseline is not None and not request.config.getoption("--benchmark-save"):
+            assert took <= baseline * (1 + threshold), (
+                f"{name}: {took * 1e6:.2f}us per call, "
+                f"baseline {baseline * 1e6:.2f}us (+{took / baseline - 1:.0%})"
+            )
+        return took
+
+    return bench
+
+
+@pytest.fixture
+def loop() -> typing.Iterator[asyncio.AbstractEventLoop]:
+    # async setup and the async functions timed by `bench` share this loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def pytest_terminal_summary(terminalreporter: typing.Any, config: pytest.Config):
+    if not results:
+        return
+    baselines = _load()
+    terminalreporter.section("benchmarks")
+    for name, took in sorted(results.items()):
+        baseline = baselines.get(name)
+        change = f"{took / baseline - 1:+.0%}" if baseline else "new"
+        terminalreporter.write_line(f"{name:<40} {took * 1e6:>12.2f}us  {change}")
+    if config.getoption("--benchmark-save"):
+        BASELINES.write_text(
+            json.dumps({**baselines, **results}, indent=4, sort_keys=True) + "\n"
+        )
+        terminalreporter.write_line(f"saved baselines to {BASELINES}")
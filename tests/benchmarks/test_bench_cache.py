@@ -0,0 +1,95 @@
+"""
+Player lookups through each cache tier. The Postgres ones need the usual DB_* variables
+pointing at a scratch database and are skipped otherwise, TETR.IO is `tools.tetrio_standin`.
+"""
+
+import os
+import pathlib
+
+import pytest
+import yarl
+
+from src.utils import api, sqls
+from src.utils.api import PlayerAPI, Request
+from src.utils.cache import LRUCache
+from src.utils.ratelimit import Scheduler
+from tools.tetrio_standin import Config, StandIn
+
+init_sql = pathlib.Path(__file__).parent.parent.parent / "src/utils/sqls/init.sql"
+
+
+def test_lru_hit(bench):
+    cache = LRUCache(max_entries=10000)
+    for i in range(10000):
+        cache.set(f"player{i}", i, ttl=60, aliases=(f"id{i}",))
+    bench("cache.lru.get[hit]", lambda: cache.get("player5000"))
+    bench("cache.lru.get[alias]", lambda: cache.get("id5000"))
+
+
+def test_lru_miss(bench):
+    cache = LRUCache(max_entries=10000)
+    bench("cache.lru.get[miss]", lambda: cache.get("nobody"))
+
+
+@pytest.fixture
+def stand_in(loop):
+    standin = StandIn(Config(players=0, latency=0, jitter=0))
+    loop.run_until_complete(standin.start())
+    base_url, limiter = api.BASE_URL, Request.limiter
+    api.BASE_URL = yarl.URL(standin.url)
+    # time the lookup, not the TETR.IO rate limit
+    Request.limiter = Scheduler(rate=1e9, burst=1000)
+    yield
+    api.BASE_URL, Request.limiter = base_url, limiter
+    loop.run_until_complete(Request.close())
+    loop.run_until_complete(standin.close())
+
+
+@pytest.fixture
+def db(loop, stand_in):
+    if not os.getenv("DB_HOST"):
+        pytest.skip("needs a scratch Postgres database (DB_HOST etc.)")
+    db = sqls.EasySQL()
+    loop.run_until_complete(db.connect())
+    loop.run_until_complete(db.execute(init_sql.read_text()))
+    loop.run_until_complete(db.execute("TRUNCATE cache"))
+    # served from memory and Postgres only, never refetched
+    loop.run_until_complete(PlayerAPI.get_player("timelessnesses", db))
+    yield db
+    PlayerAPI.memory.clear()
+    PlayerAPI.unknown.clear()
+    loop.run_until_complete(db.close())
+
+
+def test_player_memory_hit(bench, db):
+    async def lookup():
+        await PlayerAPI.get_player("timelessnesses", db)
+
+    bench("player.get_player[memory]", lookup)
+
+
+def test_player_postgres_hit(bench, db):
+    async def lookup():
+        PlayerAPI.memory.clear()
+        await PlayerAPI.get_player("timelessnesses", db)
+
+    bench("player.get_player[postgres]", lookup)
+
+
+def test_player_upstream_miss(bench, db):
+    async def lookup():
+        PlayerAPI.memory.clear()
+        await db.execute("DELETE FROM cache WHERE username = 'unpredictable'")
+        await PlayerAPI.get_player("unpredictable", db)
+
+    bench("player.get_player[upstream]", lookup)
+
+
+def test_player_unknown_hit(bench, db):
+    async def lookup():
+        try:
+            await PlayerAPI.get_player("nobody", db)
+        except api.APIError:
+            pass
+
+    bench("player.get_player[unknown]", lookup)
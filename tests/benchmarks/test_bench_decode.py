@@ -0,0 +1,21 @@
+import pathlib
+
+import orjson
+import pytest
+
+from src.utils.api import PlayerAPI
+
+example_data = pathlib.Path(__file__).parent.parent.parent / "example_data"
+files = sorted(example_data.glob("*.json"))
+
+
+@pytest.mark.parametrize("path", files, ids=[path.stem for path in files])
+def test_from_json(bench, path):
+    raw = path.read_bytes()
+    bench(f"decode.from_json[{path.stem}]", lambda: PlayerAPI.from_json(raw))
+
+
+@pytest.mark.parametrize("path", files, ids=[path.stem for path in files])
+def test_from_payload(bench, path):
+    payload = orjson.loads(path.read_bytes())
+    bench(f"decode.from_payload[{path.stem}]", lambda: PlayerAPI.from_payload(payload))
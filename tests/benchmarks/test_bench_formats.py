@@ -0,0 +1,42 @@
+import pytest
+
+from src.utils.formats import TabularData
+
+
+def test_tabular_render(bench):
+    table = TabularData()
+    table.set_columns(["#", "Username", "Rank", "TR", "APM", "PPS", "VS"])
+    table.add_rows(
+        (i, f"player{i}", "x", 25000 - i * 10, 150.5, 3.25, 300.75) for i in range(50)
+    )
+    bench("formats.TabularData.render[50]", table.render)
+
+
+class _Menu:
+    current_page = 3
+
+    def __init__(self):
+        import discord
+
+        self.embed = discord.Embed()
+
+
+@pytest.mark.parametrize("kind", ["field", "simple", "text"])
+def test_format_page(bench, loop, kind):
+    pytest.importorskip("discord.ext.menus")
+    from src.utils import paginator
+
+    entries = [(f"player{i}", f"{25000 - i * 10} TR") for i in range(120)]
+    if kind == "field":
+        source = paginator.FieldPageSource(entries)
+    elif kind == "simple":
+        source = paginator.SimplePageSource(entries, per_page=12)
+    else:
+        source = paginator.TextPageSource("\n".join(map(str, entries)))
+    menu = _Menu()
+    page = loop.run_until_complete(source.get_page(0))
+
+    async def format_page():
+        await source.format_page(menu, page)
+
+    bench(f"paginator.format_page[{kind}]", format_page)
@@ -0,0 +1,49 @@
+import numpy as np
+
+import src.utils.calc_stats as stats
+
+SCALAR = (
+    stats.app,
+    stats.ds_second,
+    stats.ds_piece,
+    stats.app_ds_piece,
+    stats.cheese_index,
+    stats.garbage_efficiency,
+    stats.area,
+    stats.weighted_app,
+)
+
+rng = np.random.default_rng(0)
+# a leaderboard page worth of plausible players
+apm = rng.uniform(10, 200, 1000)
+pps = rng.uniform(0.5, 4, 1000)
+vs = apm * rng.uniform(1.5, 2.5, 1000)
+rd = rng.uniform(60, 150, 1000)
+
+
+def test_scalar_player(bench):
+    def one():
+        for function in SCALAR:
+            function(apm=42.94, pps=1.5, vs=91)
+        stats.estimated_tr(pps=1.5, apm=42.94, vs=91, rd=60.89)
+
+    bench("stats.scalar[1]", one)
+
+
+def test_scalar_page(bench):
+    rows = [
+        {"apm": a, "pps": p, "vs": v, "rd": r}
+        for a, p, v, r in zip(apm.tolist(), pps.tolist(), vs.tolist(), rd.tolist())
+    ]
+
+    def page():
+        for row in rows:
+            for function in SCALAR:
+                function(**row)
+            stats.estimated_tr(**row)
+
+    bench("stats.scalar[1000]", page)
+
+
+def test_batch_page(bench):
+    bench("stats.batch[1000]", lambda: stats.batch(apm, pps, vs, rd))
@@ -0,0 +1,37 @@
+import pathlib
+import typing
+
+import pytest
+
+benchmarks = pathlib.Path(__file__).parent / "benchmarks"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark",
+        action="store_true",
+        help="run the benchmarks in tests/benchmarks",
+    )
+    group.addoption(
+        "--benchmark-save",
+        action="store_true",
+        help="store this run's timings as the new baselines",
+    )
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=0.5,
+        help="fail a benchmark this much slower than its baseline (default 0.5, 50%%)",
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: typing.List[pytest.Item]
+) -> None:
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if benchmarks in item.path.parents:
+            item.add_marker(skip)
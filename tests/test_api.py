@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import pathlib
+
+import aiohttp
+import orjson
+import pytest
+
+from src.utils.api import PlayerAPI, Rank, Role, timestring_to_datetime
+from src.utils.errors import APIError
+from src.utils.ratelimit import Priority
+
+example_data = pathlib.Path(__file__).parent.parent / "example_data"
+
+
+def test_decode_timelessnesses():
+    raw = (example_data / "timelessnesses.json").read_bytes()
+    player = PlayerAPI.from_json(raw)
+    user = player.data.user
+    assert player.success and player.error is None
+    assert user.username == "timelessnesses"
+    assert user.role is Role.user
+    assert user.league.rank is Rank.unranked
+    assert user.league.percentile_rank is Rank.s
+    assert user.league.prev_rank is None
+    assert user.badges[0].id == "ift_2" and user.badges[0].ts is None
+    assert user.gametime == datetime.timedelta(seconds=684426.3065555533)
+    assert str(user.avatar_url) == (
+        "https://tetr.io/user-content/avatars/61a06af00bf7c9b332b5c134.jpg?rv=1656061015283"
+    )
+
+
+def test_decoded_objects_are_slotted():
+    raw = (example_data / "timelessnesses.json").read_bytes()
+    player = PlayerAPI.from_json(raw)
+    user = player.data.user
+    for obj in (player, player.cache, player.data, user, user.league, user.badges[0]):
+        assert not hasattr(obj, "__dict__")
+
+
+def test_from_payload_leaves_payload_untouched():
+    raw = (example_data / "unpredictable.json").read_bytes()
+    payload = orjson.loads(raw)
+    PlayerAPI.from_payload(payload)
+    assert payload == orjson.loads(raw)
+
+
+def test_decode_failure():
+    player = PlayerAPI.from_payload({"success": False, "error": "No such user!"})
+    assert not player.success
+    assert player.error == "No such user!"
+    assert player.data is None
+
+
+def test_timestring_to_datetime():
+    assert timestring_to_datetime("2021-11-26T05:04:48.665Z") == datetime.datetime(
+        2021, 11, 26, 5, 4, 48, 665000, tzinfo=datetime.timezone.utc
+    )
+
+
+def test_failures_are_negatively_cached():
+    error = "No such user! | Either you mistyped something, or the account no longer exists."
+    result = {"success": False, "error": error}
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expires_at = now + datetime.timedelta(seconds=PlayerAPI.negative_ttl)
+    with pytest.raises(APIError) as raised:
+        PlayerAPI._settle(("typo", result, orjson.dumps(result), now, expires_at))
+    assert raised.value.error == error
+    with pytest.raises(APIError) as raised:
+        PlayerAPI._recall("typo")
+    assert raised.value.error == error
+
+    raw = (example_data / "timelessnesses.json").read_bytes()
+    PlayerAPI._settle(("typo", orjson.loads(raw), raw, now, expires_at))
+    assert PlayerAPI._recall("typo").data.user.username == "timelessnesses"
+    PlayerAPI.memory.clear()
+
+
+class Cache:
+    """
+    An empty `cache` table in place of `bot.db`, recording the queries.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    async def fetchall(self, query, *args):
+        self.queries.append(query)
+        return []
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        return None
+
+    async def execute(self, query, *args):
+        self.queries.append(query)
+
+
+def test_get_players_batches_misses(monkeypatch):
+    payloads = {
+        path.stem: orjson.loads(path.read_bytes())
+        for path in example_data.glob("*.json")
+    }
+    fetches = []
+
+    async def fetch(username, priority=None):
+        fetches.append(username)
+        await asyncio.sleep(0.01)
+        if username == "flaky":
+            raise aiohttp.ClientConnectionError()
+        result = payloads.get(username, {"success": False, "error": "No such user!"})
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return (
+            username,
+            result,
+            orjson.dumps(result),
+            now,
+            PlayerAPI.expires_at(result, now),
+        )
+
+    monkeypatch.setattr(PlayerAPI, "_fetch", fetch)
+
+    async def main():
+        db = Cache()
+        batch = asyncio.ensure_future(
+            PlayerAPI.get_players(
+                ["timelessnesses", "Unpredictable", "typo", "flaky"], db
+            )
+        )
+        await asyncio.sleep(0.005)
+        # joins the batch's fetch instead of looking the player up again
+        single = await PlayerAPI.get_player("timelessnesses", db)
+        return db, await batch, single
+
+    try:
+        db, players, single = asyncio.run(main())
+    finally:
+        PlayerAPI.memory.clear()
+        PlayerAPI.unknown.clear()
+    assert sorted(players) == ["timelessnesses", "unpredictable"]
+    assert single is players["timelessnesses"]
+    assert sorted(fetches) == ["flaky", "timelessnesses", "typo", "unpredictable"]
+    assert len([query for query in db.queries if query.split()[0] == "SELECT"]) == 1
+    assert len([query for query in db.queries if "INTO cache" in query]) == 1
+
+
+def test_refresh_does_not_join_lookups(monkeypatch):
+    raw = (example_data / "timelessnesses.json").read_bytes()
+    priorities = []
+
+    async def fetch(username, priority=Priority.INTERACTIVE):
+        priorities.append(priority)
+        await asyncio.sleep(0.01)
+        result = orjson.loads(raw)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return username, result, raw, now, PlayerAPI.expires_at(result, now)
+
+    monkeypatch.setattr(PlayerAPI, "_fetch", fetch)
+
+    async def main():
+        db = Cache()
+        await asyncio.gather(
+            PlayerAPI.refresh("timelessnesses", db),
+            PlayerAPI.get_player("timelessnesses", db),
+        )
+
+    try:
+        asyncio.run(main())
+    finally:
+        PlayerAPI.memory.clear()
+    # the lookup fetched at its own priority instead of waiting on the refresh
+    assert sorted(priorities) == [Priority.INTERACTIVE, Priority.BACKGROUND]
+
+
+def test_expires_at_honors_upstream_above_the_floor():
+    fetched_at = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+    floor = fetched_at + datetime.timedelta(seconds=PlayerAPI.min_ttl)
+
+    def cached_until(seconds):
+        millis = (fetched_at.timestamp() + seconds) * 1000
+        return {"success": True, "cache": {"cached_until": millis}}
+
+    assert PlayerAPI.expires_at({"success": True}, fetched_at) == floor
+    assert PlayerAPI.expires_at({"success": True, "cache": None}, fetched_at) == floor
+    assert PlayerAPI.expires_at(cached_until(1), fetched_at) == floor
+    assert PlayerAPI.expires_at(
+        cached_until(PlayerAPI.min_ttl + 600), fetched_at
+    ) == floor + datetime.timedelta(seconds=600)
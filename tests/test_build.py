@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+from src.utils import build
+from src.utils.build import Build
+
+
+def test_version_strings():
+    commit = "0123456789abcdef"
+    assert Build(commit, False, False).version == "latest (0123456)"
+    assert Build(commit, True, False).version == "0123456 (modified)"
+    assert Build(commit, False, True).version == "old (0123456) - not up to date"
+    assert Build().version == "latest (unknown)"
+
+
+def test_env_wins(monkeypatch):
+    monkeypatch.delenv("BUILD_COMMIT", raising=False)
+    monkeypatch.setenv("SOURCE_VERSION", "feedface")
+    assert build.from_env() == Build("feedface", False, False, "env")
+    monkeypatch.setenv("BUILD_COMMIT", "deadbeef")
+    assert build.from_env().commit == "deadbeef"
+
+
+def test_from_file(tmp_path):
+    path = tmp_path / "build.json"
+    assert build.from_file(path) is None
+    path.write_text(json.dumps({"commit": "abc", "modified": True, "behind": False}))
+    assert build.from_file(path) == Build("abc", True, False, "file")
+
+
+def test_from_git():
+    found = asyncio.run(build.from_git())
+    assert found.source == "git" and len(found.commit) == 40
@@ -0,0 +1,130 @@
+import asyncio
+
+from src.utils.cache import LRUCache, SingleFlight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss():
+    cache = LRUCache(max_entries=4)
+    cache.set("osk", 1, ttl=10)
+    assert cache.get("osk") == 1
+    assert cache.get("zzz") is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = LRUCache(max_entries=4, clock=clock)
+    cache.set("osk", 1, ttl=10)
+    clock.now = 9.9
+    assert cache.get("osk") == 1
+    clock.now = 10
+    assert cache.get("osk") is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_lru_eviction_by_entries():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    cache.get("a")  # b is now least recently used
+    cache.set("c", 3, ttl=10)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_lru_eviction_by_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.set("a", 1, ttl=10, weight=60)
+    cache.set("b", 2, ttl=10, weight=60)
+    assert "a" not in cache
+    assert cache.bytes == 60
+
+
+def test_aliases():
+    cache = LRUCache(max_entries=2)
+    cache.set("osk", 1, ttl=10, aliases=("5e32fc85ab319c2ab1beb07c",))
+    assert cache.get("5e32fc85ab319c2ab1beb07c") == 1
+    cache.pop("osk")
+    assert cache.get("5e32fc85ab319c2ab1beb07c") is None
+    assert len(cache) == 0
+
+
+def test_non_positive_ttl_is_not_stored():
+    cache = LRUCache()
+    cache.set("osk", 1, ttl=0)
+    assert "osk" not in cache
+
+
+def test_single_flight_shares_one_call():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("osk", fetch) for _ in range(10)))
+        assert results == [1] * 10
+        assert flight.coalesced == 9
+        assert len(flight) == 0
+        assert await flight.do("osk", fetch) == 2
+
+    asyncio.run(main())
+
+
+def test_single_flight_propagates_errors():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise KeyError("osk")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do("osk", fetch) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, KeyError) for result in results)
+
+    asyncio.run(main())
+
+
+def test_single_flight_survives_cancelled_waiter():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "osk"
+
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("osk", fetch))
+        second = asyncio.ensure_future(flight.do("osk", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "osk"
+        assert first.cancelled()
+
+    asyncio.run(main())
+
+
+def test_grace_period():
+    clock = Clock()
+    cache = LRUCache(clock=clock)
+    cache.set("osk", 1, ttl=10, grace=5)
+    assert cache.peek("osk") == (1, True)
+    clock.now = 12
+    assert cache.get("osk") is None
+    assert cache.peek("osk") == (1, False)
+    clock.now = 15
+    assert cache.peek("osk") is None
+    assert (cache.stats.hits, cache.stats.stale, cache.stats.misses) == (1, 1, 2)
@@ -0,0 +1,33 @@
+import asyncio
+
+from src.utils.charts import ChartRenderer, render_progression, render_radar
+
+league = {"apm": 42.94, "pps": 1.5, "vs": 91}
+
+
+def test_render_png():
+    assert render_radar(league).startswith(b"\x89PNG")
+    assert render_progression([(1.6e9, 15000), (1.6e9 + 86400, 15100)]).startswith(
+        b"\x89PNG"
+    )
+
+
+def test_render_radar_without_stats():
+    assert render_radar({"apm": 0, "pps": 0, "vs": 0}).startswith(b"\x89PNG")
+    assert render_radar({"apm": None, "pps": None, "vs": None}).startswith(b"\x89PNG")
+    assert render_radar({}).startswith(b"\x89PNG")
+
+
+def test_renderer_caches_by_version():
+    async def main():
+        charts = ChartRenderer(max_workers=1)
+        await charts.start()
+        try:
+            first = await charts.render("radar", "osk", 1, league)
+            assert await charts.render("radar", "osk", 1, league) is first
+            await charts.render("radar", "osk", 2, league)
+            assert (charts.cache.stats.hits, charts.cache.stats.misses) == (1, 2)
+        finally:
+            charts.close()
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import asyncio
+
+import discord
+from discord import app_commands
+
+from src.utils.command_sync import CommandSync, tree_hash
+
+
+def make_tree(description: str = "Pong!") -> app_commands.CommandTree:
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    @tree.command(name="ping", description=description)
+    async def ping(interaction: discord.Interaction, times: int = 1):
+        pass
+
+    return tree
+
+
+class Store:
+    """
+    Just the `command_sync` row, in place of `bot.db`.
+    """
+
+    def __init__(self, hash=None):
+        self.hash = hash
+
+    async def fetchval(self, query, *args):
+        return self.hash
+
+    async def execute(self, query, *args):
+        self.hash = args[0]
+
+
+def test_tree_hash_follows_the_payload():
+    assert tree_hash(make_tree()) == tree_hash(make_tree())
+    assert tree_hash(make_tree()) != tree_hash(make_tree("Ping!"))
+
+
+def test_sync_only_when_changed():
+    async def main():
+        tree = make_tree()
+        synced = []
+
+        async def sync(**kwargs):
+            synced.append(kwargs)
+            return tree.get_commands()
+
+        tree.sync = sync
+        store = Store()
+        first = CommandSync(tree, store)
+        results = await asyncio.gather(first.sync(), first.sync(), first.sync())
+        # a restart reads the stored hash
+        again = CommandSync(tree, store)
+        results += [await again.sync(), await again.sync(force=True)]
+        return results, len(synced)
+
+    results, syncs = asyncio.run(main())
+    assert results == [True, False, False, False, True]
+    assert syncs == 2
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from src.utils.error_store import ErrorStore, fingerprint
+
+
+def fail(kind):
+    try:
+        if kind == "key":
+            {}["missing"]
+        else:
+            1 / 0
+    except Exception as error:
+        return error
+
+
+def test_fingerprint_groups_identical_tracebacks():
+    assert fingerprint(fail("key")) == fingerprint(fail("key"))
+    assert fingerprint(fail("key")) != fingerprint(fail("zero"))
+
+
+def test_counts_rate_limit_and_bounds(tmp_path):
+    async def main():
+        store = ErrorStore(tmp_path, max_entries=1, interval=60)
+        reports = [(await store.record(fail("key"), "stats"))[2] for _ in range(3)]
+        entry, trace, report = await store.record(fail("zero"), "vs")
+        found = await store.trace(entry.fingerprint[:6])
+        # a restart picks the index back up
+        again = await ErrorStore(tmp_path).recent()
+        return reports, entry, trace, report, found, again
+
+    reports, entry, trace, report, found, again = asyncio.run(main())
+    assert reports == [True, False, False]
+    assert report and entry.count == 1 and entry.command == "vs"
+    assert "ZeroDivisionError" in trace and found == (entry, trace)
+    # the KeyError was evicted along with its traceback file
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{entry.fingerprint}.txt",
+        "index.json",
+    ]
+    assert [e.fingerprint for e in again] == [entry.fingerprint]
+    assert json.loads((tmp_path / "index.json").read_text())[0]["type"] == (
+        "ZeroDivisionError"
+    )
+
+
+def test_repeats_stay_in_memory_until_flushed(tmp_path):
+    async def main():
+        store = ErrorStore(tmp_path, interval=60)
+        _, first, _ = await store.record(fail("key"))
+        index = (tmp_path / "index.json").read_text()
+        repeats = []
+        for _ in range(2):
+            entry, trace, report = await store.record(fail("key"))
+            repeats.append((entry.count, trace, report))
+        unchanged = (tmp_path / "index.json").read_text() == index
+        await store.flush()
+        return first, repeats, unchanged
+
+    trace, repeats, unchanged = asyncio.run(main())
+    assert "KeyError" in trace
+    assert repeats == [(2, None, False), (3, None, False)]
+    assert unchanged
+    assert json.loads((tmp_path / "index.json").read_text())[0]["count"] == 3
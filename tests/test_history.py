@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+import os
+import pathlib
+import re
+import uuid
+
+import orjson
+import pytest
+
+from src.utils import history, sqls
+
+example_data = pathlib.Path(__file__).parent.parent / "example_data"
+init_sql = pathlib.Path(__file__).parent.parent / "src" / "utils" / "sqls" / "init.sql"
+
+
+def payload(**league):
+    result = orjson.loads((example_data / "timelessnesses.json").read_bytes())
+    result["data"]["user"]["league"].update(league)
+    return result
+
+
+class Queries:
+    """
+    Records what would be sent to Postgres, in place of `bot.db`.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, query, *args):
+        self.queries.append((query, args))
+
+    async def fetchall(self, query, *args):
+        self.queries.append((query, args))
+        return []
+
+
+def test_record_sends_one_typed_column_per_field():
+    first = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+    second = first + datetime.timedelta(minutes=5)
+    players = [payload(rating=10000.5), payload(rating=None, rank="z")]
+    db = Queries()
+    asyncio.run(history.record(db, [(first, players[0]), (second, players[1])]))
+    asyncio.run(history.record(db, []))
+
+    [(query, args)] = db.queries
+    columns = ("user_id", "recorded_at", *history.FIELDS)
+    assert re.search(
+        r"INSERT INTO player_history\(" + re.escape(", ".join(columns)) + r"\)", query
+    )
+    assert re.findall(r"\$(\d+)::(\w+)\[\]", query) == [
+        ("1", "text"),
+        ("2", "timestamptz"),
+        ("3", "float8"),  # rating
+        ("4", "float8"),  # glicko
+        ("5", "float8"),  # rd
+        ("6", "text"),  # rank
+        ("7", "float8"),  # apm
+        ("8", "float8"),  # pps
+        ("9", "float8"),  # vs
+        ("10", "int"),  # gamesplayed
+        ("11", "int"),  # gameswon
+    ]
+    # one array per column, one element per payload
+    league = players[0]["data"]["user"]["league"]
+    user_id = players[0]["data"]["user"]["_id"]
+    assert args[0] == (user_id, user_id)
+    assert args[1] == (first, second)
+    assert args[2] == (10000.5, None)
+    assert args[5] == (league["rank"], "z")
+    assert args[columns.index("gameswon")] == (league["gameswon"],) * 2
+
+
+def test_fetch_bounds():
+    since = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+    db = Queries()
+    asyncio.run(history.fetch(db, "abc", since=since))
+    [(query, args)] = db.queries
+    assert args == ("abc", since, None)
+    assert "ORDER BY recorded_at" in query
+
+
+def test_unchanged_profiles_add_no_rows():
+    if not os.getenv("DB_HOST"):
+        pytest.skip("needs a scratch Postgres database (DB_HOST etc.)")
+
+    async def main():
+        db = sqls.EasySQL()
+        await db.connect()
+        await db.execute(init_sql.read_text())
+        user_id = uuid.uuid4().hex
+        start = datetime.datetime.now(datetime.timezone.utc)
+
+        def at(minutes, **league):
+            result = payload(**league)
+            result["data"]["user"]["_id"] = user_id
+            return start + datetime.timedelta(minutes=minutes), result
+
+        try:
+            await history.record(db, [at(0, rating=100.0)])
+            await history.record(db, [at(1, rating=100.0), at(2, rating=100.0)])
+            await history.record(db, [at(3, rating=None)])
+            await history.record(db, [at(4, rating=None)])
+            await history.record(db, [at(5, rating=100.0)])
+            rows = await history.fetch(db, user_id)
+            later = await history.fetch(
+                db, user_id, since=start + datetime.timedelta(minutes=3)
+            )
+        finally:
+            await db.execute("DELETE FROM player_history WHERE user_id = $1", user_id)
+            await db.close()
+        return start, rows, later
+
+    start, rows, later = asyncio.run(main())
+    assert [row["rating"] for row in rows] == [100.0, None, 100.0]
+    assert [row["recorded_at"] - start for row in later] == [
+        datetime.timedelta(minutes=3),
+        datetime.timedelta(minutes=5),
+    ]
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import pathlib
+
+import pytest
+import yarl
+from aiohttp import web
+
+from src.utils import leaderboard, sqls
+from src.utils.api import Request
+
+init_sql = pathlib.Path(__file__).parent.parent / "src" / "utils" / "sqls" / "init.sql"
+
+players = [
+    {
+        "_id": f"{i:024x}",
+        "username": f"player{i}",
+        "country": None,
+        "league": {"rating": 25000 - i * 10, "rank": "x", "apm": 100.0},
+    }
+    for i in range(250)
+]
+
+
+async def league(request: web.Request) -> web.Response:
+    limit = int(request.query["limit"])
+    after = float(request.query.get("after", "inf"))
+    page = [user for user in players if user["league"]["rating"] < after][:limit]
+    return web.json_response({"success": True, "data": {"users": page}})
+
+
+async def collect(limit: int) -> list:
+    app = web.Application()
+    app.router.add_get("/api/users/lists/league", league)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        url = yarl.URL(f"http://127.0.0.1:{port}/api/users/lists/league")
+        return [row async for row in leaderboard.records(url=url, limit=limit)]
+    finally:
+        await Request.close()
+        await runner.cleanup()
+
+
+def test_records_page_through_leaderboard():
+    rows = asyncio.run(collect(100))
+    assert len(rows) == 250
+    assert [row[0] for row in rows] == list(range(1, 251))
+    assert rows[0][2] == "player0" and rows[-1][2] == "player249"
+    assert len(rows[0]) == len(leaderboard.COLUMNS)
+
+
+def test_records_exact_page_multiple():
+    assert len(asyncio.run(collect(50))) == 250
+
+
+def test_overlapping_ingests_are_refused():
+    if not os.getenv("DB_HOST"):
+        pytest.skip("needs a scratch Postgres database (DB_HOST etc.)")
+
+    async def slow_league(request: web.Request) -> web.Response:
+        await asyncio.sleep(0.1)
+        return await league(request)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/api/users/lists/league", slow_league)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        url = yarl.URL(f"http://127.0.0.1:{port}/api/users/lists/league")
+        db = sqls.EasySQL()
+        await db.connect()
+        await db.execute(init_sql.read_text())
+        table = "league_snapshot_test"
+        await db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (LIKE league_snapshot INCLUDING DEFAULTS)"
+        )
+        try:
+            first = asyncio.ensure_future(leaderboard.ingest(db, url=url, table=table))
+            await asyncio.sleep(0.05)
+            with pytest.raises(leaderboard.IngestRunning):
+                await leaderboard.ingest(db, url=url, table=table)
+            count, _ = await first
+            # and once it's done the next one may run
+            again, _ = await leaderboard.ingest(db, url=url, table=table)
+            return count, again
+        finally:
+            await db.execute(f"DROP TABLE IF EXISTS {table}, {table}_next")
+            await db.close()
+            await Request.close()
+            await runner.cleanup()
+
+    assert asyncio.run(main()) == (250, 250)
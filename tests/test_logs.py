@@ -0,0 +1,61 @@
+import json
+import logging
+
+from src.utils import logs
+
+
+def test_parse_levels():
+    assert logs.parse_levels("discord=WARNING, root.Reloader=debug,,broken") == {
+        "discord": "WARNING",
+        "root.Reloader": "DEBUG",
+    }
+
+
+def test_queued_json_rotating(tmp_path):
+    path = tmp_path / "logs" / "bot.log"
+    path.parent.mkdir()
+    path.write_text("last run\n")
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    listener = logs.setup(
+        level="INFO", levels={"noisy": "ERROR"}, file=str(path), json=True
+    )
+    listener.start()
+    try:
+        logging.getLogger("noisy").warning("muted")
+        logging.getLogger("root.Test").info("hello %s", "world", extra={"user": 1})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logging.getLogger("root.Test").exception("failed")
+    finally:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        root.handlers[:] = handlers
+        root.setLevel(level)
+        logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+    assert (tmp_path / "logs" / "bot.log.1").read_text() == "last run\n"
+    first, second = map(json.loads, path.read_text().splitlines())
+    assert first["message"] == "hello world" and first["user"] == 1
+    assert first["logger"] == "root.Test" and first["level"] == "INFO"
+    assert second["message"] == "failed"
+    assert "ZeroDivisionError" in second["exception"]
+
+
+def test_stop_flushes_without_start(tmp_path):
+    path = tmp_path / "bot.log"
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    listener = logs.setup(level="INFO", levels={}, file=str(path), json=False)
+    try:
+        logging.getLogger("root.Test").error("startup failed")
+    finally:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        root.handlers[:] = handlers
+        root.setLevel(level)
+
+    assert "startup failed" in path.read_text()
@@ -0,0 +1,88 @@
+import math
+import urllib.request
+
+from src.utils.metrics import Histogram, Registry, Server
+
+
+def test_histogram_buckets_and_quantile():
+    histogram = Histogram("latency_seconds", "Latency.", ("status",), (0.1, 1.0))
+    assert math.isnan(histogram.quantile(0.5, "200"))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "200")
+    samples = {name + labels: value for name, labels, value in histogram.samples()}
+    assert samples['latency_seconds_bucket{status="200",le="0.1"}'] == 2
+    assert samples['latency_seconds_bucket{status="200",le="1.0"}'] == 3
+    assert samples['latency_seconds_bucket{status="200",le="+Inf"}'] == 4
+    assert samples['latency_seconds_count{status="200"}'] == 4
+    assert samples['latency_seconds_sum{status="200"}'] == 2.65
+    assert histogram.quantile(0.5, "200") == 0.1
+    assert histogram.quantile(0.75, "200") == 1.0
+
+
+def test_registry_keeps_values_across_registrations():
+    registry = Registry()
+    registry.counter("errors_total", "Errors.", ("error",)).inc('Bad "quote"')
+    registry.counter("errors_total", "Errors.", ("error",)).inc('Bad "quote"')
+    registry.callback("size", "Size.", lambda: 3)
+    assert registry.render() == (
+        "# HELP errors_total Errors.\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{error="Bad \\"quote\\""} 2\n'
+        "# HELP size Size.\n"
+        "# TYPE size gauge\n"
+        "size 3\n"
+    )
+
+
+def test_server_exposes_metrics():
+    registry = Registry()
+    registry.callback("up", "Up.", lambda: 1)
+    server = Server(registry, host="127.0.0.1", port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as r:
+            assert r.headers["Content-Type"].startswith("text/plain")
+            assert "up 1\n" in r.read().decode()
+    finally:
+        server.close()
+
+
+def test_rate_limit_waits_are_exported(monkeypatch):
+    from src.utils import metrics
+    from src.utils.api import Request
+    from src.utils.ratelimit import Priority, Scheduler
+
+    monkeypatch.setattr(Request, "limiter", Scheduler(1, 1))
+    Request.limiter._record(Priority.BACKGROUND, 0.25)
+    Request.limiter._record(Priority.BACKGROUND, 0.75)
+    lines = metrics.REGISTRY.render().splitlines()
+    assert 'osk_tetrio_tokens_total{priority="background"} 2' in lines
+    assert 'osk_tetrio_wait_seconds_total{priority="background"} 1.0' in lines
+    assert 'osk_tetrio_wait_max_seconds{priority="background"} 0.75' in lines
+    assert 'osk_tetrio_wait_max_seconds{priority="interactive"} 0.0' in lines
+
+
+def test_unknown_commands_are_not_errors():
+    import asyncio
+    import types
+
+    from src.utils import metrics
+
+    listeners = {}
+    bot = types.SimpleNamespace(
+        add_listener=lambda listener: listeners.setdefault(listener.__name__, listener)
+    )
+    metrics.instrument(bot)
+    before = dict(metrics.COMMAND_ERRORS.values)
+    command = types.SimpleNamespace(qualified_name="stats")
+    asyncio.run(
+        listeners["on_command_error"](types.SimpleNamespace(command=None), KeyError())
+    )
+    asyncio.run(
+        listeners["on_command_error"](
+            types.SimpleNamespace(command=command), KeyError()
+        )
+    )
+    after = metrics.COMMAND_ERRORS.values
+    assert after.get(("", "KeyError")) == before.get(("", "KeyError"))
+    assert after[("stats", "KeyError")] == before.get(("stats", "KeyError"), 0) + 1
@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+import email.utils
+
+from src.utils.api import retry_after
+from src.utils.ratelimit import Priority, Scheduler
+
+
+def test_burst_is_immediate():
+    async def main():
+        scheduler = Scheduler(rate=1, burst=3)
+        await asyncio.wait_for(
+            asyncio.gather(*(scheduler.acquire() for _ in range(3))), 0.1
+        )
+        assert scheduler.waits[Priority.INTERACTIVE].count == 3
+        assert scheduler.waits[Priority.INTERACTIVE].max == 0
+
+    asyncio.run(main())
+
+
+def test_interactive_served_before_background():
+    async def main():
+        scheduler = Scheduler(rate=100, burst=1)
+        await scheduler.acquire()
+        order = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        background = [
+            asyncio.ensure_future(request(f"bg{i}", Priority.BACKGROUND))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request("cmd", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        assert scheduler.depth() == 4 and scheduler.depth(Priority.BACKGROUND) == 3
+        await asyncio.gather(interactive, *background)
+        assert order == ["cmd", "bg0", "bg1", "bg2"]
+
+    asyncio.run(main())
+
+
+def test_pause_holds_requests():
+    async def main():
+        loop = asyncio.get_running_loop()
+        scheduler = Scheduler(rate=100, burst=5)
+        scheduler.pause(0.05)
+        started = loop.time()
+        await scheduler.acquire()
+        assert loop.time() - started >= 0.04
+        assert scheduler.throttled == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_take_a_token():
+    async def main():
+        scheduler = Scheduler(rate=50, burst=1)
+        await scheduler.acquire()
+        cancelled = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(scheduler.acquire(), 0.1)
+        assert scheduler.waits[Priority.INTERACTIVE].count == 2
+
+    asyncio.run(main())
+
+
+def test_retry_after():
+    assert retry_after("3") == 3
+    assert retry_after(None) is None
+    when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    assert 25 < retry_after(email.utils.format_datetime(when)) <= 30
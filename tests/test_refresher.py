@@ -0,0 +1,33 @@
+import asyncio
+
+from src.utils.refresher import Refresher
+
+
+def test_track_evicts_least_recent():
+    refresher = Refresher(None, max_tracked=2)
+    refresher.track("a")
+    refresher.track("b")
+    refresher.track("a")
+    refresher.track("c")
+    assert refresher.tracked == ["a", "c"]
+
+
+def test_revalidate_respects_budget():
+    async def main():
+        refresher = Refresher(None, budget=2)
+        started = []
+
+        async def refresh(username):
+            started.append(username)
+
+        refresher._refresh = refresh
+        assert refresher.revalidate("a")
+        assert refresher.revalidate("a")  # already refreshing, no extra spend
+        assert refresher.revalidate("b")
+        assert not refresher.revalidate("c")
+        await asyncio.sleep(0)
+        return refresher, started
+
+    refresher, started = asyncio.run(main())
+    assert started == ["a", "b"]
+    assert refresher.skipped == 1
@@ -0,0 +1,140 @@
+import asyncio
+import importlib
+import sys
+import threading
+
+from src.utils.reloader import Reloader, dependency_order, imports, module_name
+
+
+def make_package(tmp_path, monkeypatch):
+    package = tmp_path / "reloadpkg"
+    (package / "utils").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "utils" / "__init__.py").write_text("")
+    (package / "utils" / "base.py").write_text("VALUE = 1\n")
+    (package / "utils" / "mid.py").write_text("from .base import VALUE\n")
+    (package / "cog.py").write_text("from .utils import mid\n")
+    (package / "other.py").write_text("import json\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("base", "mid"):
+        importlib.import_module(f"reloadpkg.utils.{name}")
+    importlib.import_module("reloadpkg.cog")
+    importlib.import_module("reloadpkg.other")
+    return package
+
+
+def test_module_name():
+    assert module_name("src/utils/api.py") == "src.utils.api"
+    assert module_name("src/utils/sqls/__init__.py") == "src.utils.sqls"
+    assert module_name("src/utils/sqls/init.sql") is None
+
+
+def test_dependents_come_after_dependencies(tmp_path, monkeypatch):
+    make_package(tmp_path, monkeypatch)
+    try:
+        assert dependency_order(["reloadpkg.utils.base"], prefix="reloadpkg.") == [
+            "reloadpkg.utils.base",
+            "reloadpkg.utils.mid",
+            "reloadpkg.cog",
+        ]
+        assert dependency_order(["reloadpkg.cog"], prefix="reloadpkg.") == [
+            "reloadpkg.cog"
+        ]
+    finally:
+        for name in [name for name in sys.modules if name.startswith("reloadpkg")]:
+            del sys.modules[name]
+
+
+class Bot:
+    def __init__(self):
+        self.extensions = {"reloadpkg.cog": None}
+        self.reloaded = []
+
+    async def reload_extension(self, name):
+        self.reloaded.append(name)
+
+
+def test_bursts_reload_once(tmp_path, monkeypatch):
+    package = make_package(tmp_path, monkeypatch)
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        bot = Bot()
+        reloader = Reloader(
+            bot, asyncio.get_running_loop(), package="reloadpkg", delay=0.05
+        )
+        calls = []
+        reload = reloader.reload
+
+        async def counted():
+            calls.append(await reload())
+
+        reloader.reload = counted
+        (package / "utils" / "base.py").write_text("VALUE = 2\n")
+
+        def editor():  # a save is several events, from the watchdog thread
+            for _ in range(3):
+                reloader._changed("reloadpkg/utils/base.py")
+
+        thread = threading.Thread(target=editor)
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.2)
+        return calls, bot.reloaded
+
+    try:
+        calls, extensions = asyncio.run(main())
+        assert calls == [
+            ["reloadpkg.utils.base", "reloadpkg.utils.mid", "reloadpkg.cog"]
+        ]
+        assert extensions == ["reloadpkg.cog"]
+        assert sys.modules["reloadpkg.utils.mid"].VALUE == 2
+    finally:
+        for name in [name for name in sys.modules if name.startswith("reloadpkg")]:
+            del sys.modules[name]
+
+
+def test_stateful_modules_and_their_imports_are_left_alone(tmp_path, monkeypatch):
+    package = make_package(tmp_path, monkeypatch)
+    mid = sys.modules["reloadpkg.utils.mid"]
+
+    async def main():
+        bot = Bot()
+        reloader = Reloader(
+            bot,
+            asyncio.get_running_loop(),
+            package="reloadpkg",
+            stateful={"reloadpkg.utils.mid"},
+        )
+        (package / "utils" / "base.py").write_text("VALUE = 2\n")
+        # base is what mid is built from, reloading it would split the two
+        reloader.pending = {"reloadpkg.utils.base"}
+        first = await reloader.reload()
+        reloader.pending = {"reloadpkg.cog"}
+        return first, await reloader.reload()
+
+    try:
+        assert asyncio.run(main()) == ([], ["reloadpkg.cog"])
+        assert sys.modules["reloadpkg.utils.mid"] is mid and mid.VALUE == 1
+        assert sys.modules["reloadpkg.utils.base"].VALUE == 1
+    finally:
+        for name in [name for name in sys.modules if name.startswith("reloadpkg")]:
+            del sys.modules[name]
+
+
+def test_type_checking_imports_are_ignored(tmp_path, monkeypatch):
+    package = make_package(tmp_path, monkeypatch)
+    (package / "hinted.py").write_text(
+        "import typing\n"
+        "if typing.TYPE_CHECKING:\n"
+        "    from .utils import mid\n"
+        "else:\n"
+        "    from .utils import base\n"
+    )
+    try:
+        hinted = importlib.import_module("reloadpkg.hinted")
+        assert "reloadpkg.utils.mid" not in imports(hinted)
+        assert "reloadpkg.utils.base" in imports(hinted)
+    finally:
+        for name in [name for name in sys.modules if name.startswith("reloadpkg")]:
+            del sys.modules[name]
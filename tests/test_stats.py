@@ -5,6 +5,8 @@ sys.path.append(".")  # for test outside tests folder
 import typing
 from decimal import ROUND_05UP, Decimal
 
+import numpy as np
+
 import src.utils.calc_stats as stats
 
 data_set: dict[str, typing.Union[int, float]] = {
@@ -103,3 +105,75 @@ def test_weighted_app():
         )
         == 0.5084
     )
+
+
+def test_batch_matches_scalar():
+    players = {
+        "apm": np.array([42.94, 120.5, 12.0]),
+        "pps": np.array([1.5, 2.9, 0.6]),
+        "vs": np.array([91, 260.3, 20.1]),
+        "rd": np.array([60.89, 60.0, 120.0]),
+    }
+    result = stats.batch_table(players)
+    for name, values in result.items():
+        expected = [
+            getattr(stats, name)(**{key: column[i] for key, column in players.items()})
+            for i in range(3)
+        ]
+        np.testing.assert_allclose(values, expected, rtol=1e-12)
+
+
+def test_batch_zero_pps_and_apm_is_nan():
+    result = stats.batch(apm=[0, 10], pps=[1, 0], vs=[0, 5])
+    assert np.isnan(result["cheese_index"][0])
+    assert np.isnan(result["app"][1])
+    assert np.isnan(result["ds_piece"][1])
+    assert result["ds_second"][1] == (5 / 100) - (10 / 60)
+
+
+def test_estimated_tr():
+    assert (
+        float(
+            Decimal(stats.estimated_tr(**data_set)).quantize(
+                Decimal(".0001"), rounding=ROUND_05UP
+            )
+        )
+        == 17074.2288
+    )
+
+
+def test_estimated_tr_golden_values():
+    # (pps, apm, vs, rd) -> value of the literal formula in formula.txt
+    golden = {
+        (1.33, 33.17, 70.37, 127.69102210653995): 12875.2418,
+        (3.5, 180, 400, 60): 24979.9478,
+        (0.3, 3, 5, 350): 1069.3594,
+    }
+    for (pps, apm, vs, rd), expected in golden.items():
+        assert (
+            float(
+                Decimal(stats.estimated_tr(pps=pps, apm=apm, vs=vs, rd=rd)).quantize(
+                    Decimal(".0001"), rounding=ROUND_05UP
+                )
+            )
+            == expected
+        )
+
+
+def test_estimated_tr_extreme_rd():
+    assert stats.estimated_tr(**{**data_set, "rd": 1e300}) == 12500
+    assert np.isfinite(stats.estimated_tr(**{**data_set, "rd": 0}))
+
+
+def test_estimated_tr_array():
+    players = {
+        "pps": np.array([1.5, 1.33, 3.5]),
+        "apm": np.array([42.94, 33.17, 180]),
+        "vs": np.array([91, 70.37, 400]),
+        "rd": np.array([60.89, 127.69102210653995, 60]),
+    }
+    expected = [17074.2288, 12875.2418, 24979.9478]
+    np.testing.assert_allclose(stats.estimated_tr(**players), expected, atol=1e-4)
+    np.testing.assert_allclose(
+        stats.batch_table(players)["estimated_tr"], expected, atol=1e-4
+    )
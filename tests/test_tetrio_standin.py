@@ -0,0 +1,103 @@
+import asyncio
+
+import yarl
+
+from src.utils import api
+from src.utils.api import PlayerAPI, Request
+from src.utils.errors import UpstreamError
+from src.utils.ratelimit import Scheduler
+from src.utils.refresher import Refresher
+from tools.tetrio_standin import Config, StandIn
+
+
+def test_standin_serves_players_and_leaderboard():
+    async def main():
+        standin = StandIn(Config(players=150, latency=0, jitter=0))
+        await standin.start()
+        try:
+            url = yarl.URL(standin.url)
+            player = PlayerAPI.from_payload(await Request.get(url / "Player42"))
+            assert player.data.user.username == "player42"
+            assert player.data.user._id == f"{42:024x}"
+            assert not (await Request.get(url / "nobody"))["success"]
+            page = await Request.get((url / "lists" / "league").with_query(limit=100))
+            ratings = [user["league"]["rating"] for user in page["data"]["users"]]
+            assert len(ratings) == 100 and ratings == sorted(ratings, reverse=True)
+            assert standin.requests == {"users": 2, "league": 1}
+        finally:
+            await Request.close()
+            await standin.close()
+
+    asyncio.run(main())
+
+
+def test_standin_injects_errors():
+    async def main():
+        standin = StandIn(Config(players=0, latency=0, jitter=0, error_rate=1))
+        await standin.start()
+        await Request.start(retries=0)
+        try:
+            await Request.get(yarl.URL(standin.url) / "timelessnesses")
+        except UpstreamError as error:
+            return error.error, standin.statuses
+        finally:
+            await Request.close()
+            await standin.close()
+
+    error, statuses = asyncio.run(main())
+    assert error == "TETR.IO answered with HTTP 500"
+    assert statuses == {500: 1}
+
+
+def test_throttled_until_retries_run_out(monkeypatch):
+    monkeypatch.setattr(Request, "limiter", Scheduler(1000, 10))
+
+    async def main():
+        standin = StandIn(
+            Config(players=0, latency=0, jitter=0, ratelimit_rate=1, retry_after=0.05)
+        )
+        await standin.start()
+        await Request.start(retries=2)
+        try:
+            url = yarl.URL(standin.url) / "timelessnesses"
+            started = asyncio.get_running_loop().time()
+            try:
+                await Request.get(url)
+            except UpstreamError as error:
+                message = error.error
+            waited = asyncio.get_running_loop().time() - started
+            return message, waited, standin.statuses
+        finally:
+            await Request.close()
+            await standin.close()
+
+    message, waited, statuses = asyncio.run(main())
+    assert message == "TETR.IO answered with HTTP 429"
+    # paused for Retry-After before each retry, then gave up
+    assert statuses == {429: 3}
+    assert Request.limiter.throttled == 2
+    assert waited >= 0.1
+
+
+def test_refresher_keeps_players_while_throttled(monkeypatch):
+    monkeypatch.setattr(Request, "limiter", Scheduler(1000, 10))
+
+    async def main():
+        standin = StandIn(
+            Config(players=0, latency=0, jitter=0, ratelimit_rate=1, retry_after=0)
+        )
+        await standin.start()
+        monkeypatch.setattr(api, "BASE_URL", yarl.URL(standin.url))
+        await Request.start(retries=1, backoff=0)
+        refresher = Refresher(None)
+        refresher.track("timelessnesses")
+        try:
+            await refresher._refresh("timelessnesses")
+        finally:
+            await Request.close()
+            await standin.close()
+        return refresher
+
+    refresher = asyncio.run(main())
+    assert refresher.tracked == ["timelessnesses"]
+    assert refresher.failed == 1
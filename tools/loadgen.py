@@ -0,0 +1,183 @@
+"""
+Drive `PlayerAPI.get_player` at a fixed concurrency and report throughput and latency.
+
+Lookups go to a `tools.tetrio_standin` started in-process (or the one at `--url`) and
+through the real cache tiers, so the DB_* variables must point at a scratch database.
+Names are drawn with a Zipf-like skew, a few popular players and a long tail, plus a
+fraction of names that don't exist.
+
+    python -m tools.loadgen --concurrency 50 --requests 5000 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import typing
+
+import yarl
+from dotenv import load_dotenv
+
+from src.utils import api, sqls
+from src.utils.api import PlayerAPI, Request
+from src.utils.errors import APIError, UpstreamError
+from src.utils.ratelimit import Scheduler
+from src.utils.refresher import Refresher
+
+from .tetrio_standin import Config, StandIn
+
+
+def percentile(ordered: typing.Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def names(count: int, unknown: float, skew: float, seed: int) -> typing.Iterator[str]:
+    rng = random.Random(seed)
+    population = [f"player{i}" for i in range(count)]
+    weights = [1 / (rank + 1) ** skew for rank in range(count)]
+    while True:
+        if rng.random() < unknown:
+            yield f"nobody{rng.randrange(count)}"
+        else:
+            yield rng.choices(population, weights)[0]
+
+
+async def run(args: argparse.Namespace) -> None:
+    standin = None
+    if args.url is None:
+        standin = StandIn(
+            Config(
+                players=args.players,
+                latency=args.latency,
+                jitter=args.latency / 4,
+                error_rate=args.error_rate,
+                ratelimit_rate=args.ratelimit_rate,
+                cache_ttl=args.cache_ttl,
+            )
+        )
+        await standin.start()
+        api.BASE_URL = yarl.URL(standin.url)
+    else:
+        api.BASE_URL = yarl.URL(args.url)
+    if args.rate is not None:
+        Request.limiter = Scheduler(args.rate, args.burst or int(args.rate * 2))
+
+    db = sqls.EasySQL()
+    await db.connect()
+    with open("src/utils/sqls/init.sql") as f:
+        await db.execute(f.read())
+    if not args.keep_cache:
+        await db.execute("TRUNCATE cache")
+    refresher = None
+    if args.refresher:
+        refresher = Refresher(db)
+        refresher.start()
+
+    lookups = names(min(args.names, args.players), args.unknown, args.skew, args.seed)
+    latencies: typing.List[float] = []
+    outcomes = {"ok": 0, "unknown": 0, "upstream": 0, "error": 0}
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    remaining = args.requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+            remaining -= 1
+            username = next(lookups)
+            started = time.perf_counter()
+            try:
+                await PlayerAPI.get_player(username, db)
+                outcomes["ok"] += 1
+            except APIError:
+                outcomes["unknown"] += 1
+            except UpstreamError:
+                outcomes["upstream"] += 1
+            except Exception:
+                outcomes["error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        elapsed = time.perf_counter() - started
+        if refresher is not None:
+            await refresher.close()
+        await Request.close()
+        await db.close()
+        if standin is not None:
+            await standin.close()
+
+    latencies.sort()
+    stats = PlayerAPI.memory.stats
+    print(f"{len(latencies)} lookups in {elapsed:.2f}s, {args.concurrency} concurrent")
+    print(f"throughput  {len(latencies) / elapsed:.1f}/s")
+    print(
+        "latency     "
+        + "  ".join(
+            f"{name} {percentile(latencies, q) * 1000:.1f}ms"
+            for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        )
+    )
+    print("outcomes    " + "  ".join(f"{k} {v}" for k, v in outcomes.items()))
+    print(
+        f"memory      {stats.hits} hit  {stats.stale} stale  {stats.misses} miss  "
+        f"{PlayerAPI.unknown.stats.hits} unknown  "
+        f"{PlayerAPI.inflight.coalesced} coalesced"
+    )
+    if standin is not None:
+        print(
+            f"upstream    {sum(standin.requests.values())} requests  "
+            + "  ".join(f"{k}: {v}" for k, v in sorted(standin.statuses.items()))
+        )
+    waits = Request.limiter.waits
+    print(
+        f"rate limit  {Request.limiter.throttled} throttled  "
+        + "  ".join(
+            f"{priority.name.lower()} avg {wait.average * 1000:.1f}ms "
+            f"max {wait.max * 1000:.1f}ms"
+            for priority, wait in waits.items()
+            if wait.count
+        )
+    )
+
+
+def main() -> None:
+    load_dotenv()
+    defaults = Config()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument(
+        "--duration", type=float, help="stop after this many seconds instead"
+    )
+    parser.add_argument("--names", type=int, default=200, help="distinct players")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent")
+    parser.add_argument("--unknown", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-cache", action="store_true")
+    parser.add_argument("--refresher", action="store_true")
+    parser.add_argument("--rate", type=float, help="override TETRIO_RATE")
+    parser.add_argument("--burst", type=int, help="override TETRIO_BURST")
+    parser.add_argument("--url", help="use a stand-in that's already running")
+    standin = parser.add_argument_group("in-process stand-in")
+    standin.add_argument("--players", type=int, default=defaults.players)
+    standin.add_argument("--latency", type=float, default=defaults.latency)
+    standin.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    standin.add_argument(
+        "--ratelimit-rate", type=float, default=defaults.ratelimit_rate
+    )
+    standin.add_argument("--cache-ttl", type=float, default=defaults.cache_ttl)
+    args = parser.parse_args()
+    if args.duration:
+        args.requests = float("inf")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Local stand-in for the parts of ch.tetr.io the bot uses, for load testing without
+touching the real API.
+
+Serves `/api/users/<name>` from `example_data` plus `player0`..`player<N-1>` cloned from
+it, and `/api/users/lists/league` over the same players. Latency, 5xx errors and 429s
+can be injected, `/stats` reports what was served.
+
+    python -m tools.tetrio_standin --port 8080 --latency 0.1 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import collections
+import copy
+import dataclasses
+import pathlib
+import random
+import time
+import typing
+
+import orjson
+from aiohttp import web
+
+EXAMPLE_DATA = pathlib.Path(__file__).parent.parent / "example_data"
+
+NO_SUCH_USER = (
+    "No such user! | Either you mistyped something, or the account no longer exists."
+)
+
+
+@dataclasses.dataclass
+class Config:
+    # synthetic players on top of example_data
+    players: int = 1000
+    # seconds per response, uniformly +-jitter
+    latency: float = 0.05
+    jitter: float = 0.02
+    # fraction of requests answered with a 500 / a 429
+    error_rate: float = 0.0
+    ratelimit_rate: float = 0.0
+    retry_after: float = 1.0
+    # upstream cache lifetime advertised in `cache.cached_until`
+    cache_ttl: float = 60.0
+    seed: int = 0
+
+
+def seed_players(players: int, seed: int = 0) -> typing.Dict[str, dict]:
+    """
+    `data.user` objects keyed by lowercased username, the example players included.
+    """
+    rng = random.Random(seed)
+    examples = [
+        orjson.loads(path.read_bytes())["data"]["user"]
+        for path in sorted(EXAMPLE_DATA.glob("*.json"))
+    ]
+    users = {user["username"].lower(): user for user in examples}
+    for i in range(players):
+        user = copy.deepcopy(examples[i % len(examples)])
+        user["_id"] = f"{i:024x}"
+        user["username"] = f"player{i}"
+        league = user["league"]
+        league["apm"] = round(rng.uniform(10, 200), 2)
+        league["pps"] = round(rng.uniform(0.5, 4), 2)
+        league["vs"] = round(league["apm"] * rng.uniform(1.5, 2.5), 2)
+        league["rating"] = rng.uniform(0, 25000)
+        users[user["username"]] = user
+    return users
+
+
+class StandIn:
+    def __init__(self, config: typing.Optional[Config] = None) -> None:
+        self.config = config or Config()
+        self.users = seed_players(self.config.players, self.config.seed)
+        self.league = sorted(
+            (user for user in self.users.values() if user["league"].get("rating")),
+            key=lambda user: -user["league"]["rating"],
+        )
+        self.statuses: typing.Counter[int] = collections.Counter()
+        self.requests: typing.Counter[str] = collections.Counter()
+        self._rng = random.Random(self.config.seed)
+        self._runner: typing.Optional[web.AppRunner] = None
+        self.port: typing.Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/users"
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/users/lists/league", self.leaderboard)
+        app.router.add_get("/api/users/{name}", self.user)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+        self._runner = None
+
+    def _cache(self) -> dict:
+        now = time.time() * 1000
+        return {
+            "status": "miss",
+            "cached_at": now,
+            "cached_until": now + self.config.cache_ttl * 1000,
+        }
+
+    async def _answer(self, endpoint: str, data: typing.Callable[[], dict]):
+        config = self.config
+        self.requests[endpoint] += 1
+        await asyncio.sleep(
+            max(0.0, config.latency + self._rng.uniform(-config.jitter, config.jitter))
+        )
+        roll = self._rng.random()
+        if roll < config.ratelimit_rate:
+            response = web.json_response(
+                {"success": False, "error": "Rate limit exceeded"},
+                status=429,
+                headers={"Retry-After": str(config.retry_after)},
+            )
+        elif roll < config.ratelimit_rate + config.error_rate:
+            response = web.Response(status=500, text="Internal Server Error")
+        else:
+            response = web.Response(
+                body=orjson.dumps(data()), content_type="application/json"
+            )
+        self.statuses[response.status] += 1
+        return response
+
+    async def user(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info["name"].lower())
+        if user is None:
+            return await self._answer(
+                "users", lambda: {"success": False, "error": NO_SUCH_USER}
+            )
+        return await self._answer(
+            "users",
+            lambda: {"success": True, "cache": self._cache(), "data": {"user": user}},
+        )
+
+    async def leaderboard(self, request: web.Request) -> web.Response:
+        limit = min(int(request.query.get("limit", "50")), 100)
+        after = float(request.query.get("after", "inf"))
+
+        def page() -> dict:
+            users = [user for user in self.league if user["league"]["rating"] < after]
+            return {
+                "success": True,
+                "cache": self._cache(),
+                "data": {"users": users[:limit]},
+            }
+
+        return await self._answer("league", page)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"requests": dict(self.requests), "statuses": dict(self.statuses)}
+        )
+
+
+def main() -> None:
+    defaults = Config()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--players", type=int, default=defaults.players)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--ratelimit-rate", type=float, default=defaults.ratelimit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--cache-ttl", type=float, default=defaults.cache_ttl)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+    config = Config(
+        **{
+            field.name: getattr(args, field.name)
+            for field in dataclasses.fields(Config)
+        }
+    )
+    standin = StandIn(config)
+    print(
+        f"Serving {len(standin.users)} players on http://{args.host}:{args.port}/api/users"
+    )
+    web.run_app(standin.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()